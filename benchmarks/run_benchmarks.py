@@ -0,0 +1,291 @@
+"""
+Benchmarks of the regex -> NFA -> DFA -> minimized DFA pipeline
+
+Every pattern family is scaled by size and every stage of the pipeline is timed (best of
+--repeat runs) and measured for peak memory (one extra run under tracemalloc), the results are
+written as JSON so that two commits can be compared with --compare
+
+    python benchmarks/run_benchmarks.py --output results.json
+    python benchmarks/run_benchmarks.py --output new.json --compare results.json
+"""
+import argparse
+import io
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+from regex_to_NFA import NFA_CLASS  # noqa: E402
+from NFA_to_DFA import DFA_CLASS  # noqa: E402
+from alphabet_partition import AlphabetPartition  # noqa: E402
+from dfa_matcher import CompiledDFA  # noqa: E402
+from json_serialize import JsonSerialize  # noqa: E402
+from glushkov import glushkov_nfa  # noqa: E402
+from epsilon_elimination import remove_epsilons  # noqa: E402
+
+# Version of the layout of the JSON results
+RESULTS_VERSION = 1
+# Stages faster than this in both runs are timer noise and never reported as regressions
+DEFAULT_MIN_SECONDS = 0.001
+
+
+def words(count):
+    """
+    count distinct lowercase words (base 26 numbers written with the letters a-z)
+    """
+    result = []
+    for i in range(count):
+        word = ""
+        i += 26
+        while i:
+            i, digit = divmod(i, 26)
+            word += chr(ord("a") + digit)
+        result.append(word)
+    return result
+
+
+def long_literal(size):
+    return "".join(words(size))[:size]
+
+
+def big_alternation(size):
+    return "|".join(words(size))
+
+
+def nested_stars(size):
+    regex = "a"
+    for i in range(size):
+        regex = f"({regex}{chr(ord('b') + i % 24)}*)*"
+    return regex
+
+
+def blowup(size):
+    # the DFA of (a|b)*a(a|b){n} needs 2^(n+1) states
+    return "(a|b)*a" + "(a|b)" * size
+
+
+def wide_classes(size):
+    # overlapping classes, every one of them splits the alphabet partition again
+    return "".join(f"[{chr(ord('a') + i % 26)}-z0-9_]" for i in range(size)) + "[A-Z]+"
+
+
+# Family name -> (pattern of a size, sizes, quick sizes)
+FAMILIES = {
+    "long_literal": (long_literal, (100, 400, 1600), (50, 100)),
+    "big_alternation": (big_alternation, (50, 200, 800), (20, 50)),
+    "nested_stars": (nested_stars, (4, 16, 64), (4, 8)),
+    "blowup": (blowup, (4, 7, 10), (3, 5)),
+    "wide_classes": (wide_classes, (10, 40, 160), (5, 10)),
+}
+
+
+class PatternStages:
+    def __init__(self, regex):
+        """_summary_
+        Runs the whole pipeline of a regex once, keeping the input of every stage so that each
+        stage can then be run again on its own
+        Args:
+            regex (str): the regular expression
+        """
+        self.regex = regex
+        self.nfa_class = NFA_CLASS(regex, export=False)
+        nfa = self.nfa_class._nfa
+        self.alphabet = AlphabetPartition.from_nfa(nfa)
+        self.class_nfa = self.alphabet.apply(nfa)
+        self.dfa_class = self.subset_construction()
+        self.minimized = self.dfa_class.minimize_dfa(self.alphabet.inputs, algorithm="hopcroft")
+        self.compiled = CompiledDFA.from_dfa(self.minimized)
+
+    def subset_construction(self):
+        dfa_class = DFA_CLASS(verbose=False)
+        dfa_class.subset_construction(self.class_nfa, self.alphabet.inputs)
+        return dfa_class
+
+    def stages(self):
+        """_summary_
+        Returns:
+            dict: stage name -> function that runs the stage
+        """
+        nfa_class = self.nfa_class
+        json_serialize = JsonSerialize()
+        return {
+            "tokenize": nfa_class.tokenize,
+            "parse": nfa_class.parse,
+            "AST_to_NFA": nfa_class.AST_to_NFA,
+            "glushkov": lambda: glushkov_nfa(nfa_class._ast),
+            "remove_epsilons": lambda: remove_epsilons(nfa_class._nfa),
+            "alphabet_partition": lambda: AlphabetPartition.from_nfa(nfa_class._nfa).apply(
+                nfa_class._nfa
+            ),
+            "subset_construction": self.subset_construction,
+            "minimize_moore": lambda: self.dfa_class.minimize_dfa(
+                self.alphabet.inputs, algorithm="moore"
+            ),
+            "minimize_hopcroft": lambda: self.dfa_class.minimize_dfa(
+                self.alphabet.inputs, algorithm="hopcroft"
+            ),
+            "compile_table": lambda: CompiledDFA.from_dfa(self.minimized),
+            "nfa_json": lambda: json_serialize.write_json(
+                json_serialize.nfa_json_items(nfa_class._nfa), io.StringIO()
+            ),
+            "dfa_json": lambda: json_serialize.write_json(
+                json_serialize.dfa_json_items(self.minimized), io.StringIO()
+            ),
+            "binary": self.compiled.to_bytes,
+        }
+
+    def sizes(self):
+        nfa = self.nfa_class._nfa
+        return {
+            "regex_length": len(self.regex),
+            "nfa_states": len(nfa.states),
+            "nfa_edges": len(nfa.transitions),
+            "alphabet_classes": len(self.alphabet.inputs),
+            "dfa_states": len(self.dfa_class._dfa.states),
+            "minimized_states": len(self.minimized.states),
+        }
+
+
+def measure(stage, repeat):
+    """_summary_
+    Args:
+        stage (function): the stage to run
+        repeat (int): number of timed runs
+    Returns:
+        dict: best and mean time of the runs and the peak memory of one more run
+    """
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        stage()
+        times.append(time.perf_counter() - start)
+
+    # memory is measured in its own run, tracemalloc slows everything down
+    tracemalloc.start()
+    try:
+        baseline = tracemalloc.get_traced_memory()[0]
+        tracemalloc.reset_peak()
+        stage()
+        peak = tracemalloc.get_traced_memory()[1] - baseline
+    finally:
+        tracemalloc.stop()
+    return {"seconds": min(times), "mean_seconds": sum(times) / len(times), "peak_bytes": peak}
+
+
+def run(families, repeat, quick):
+    """_summary_
+    Args:
+        families (list): names of the families to run
+        repeat (int): number of timed runs of every stage
+        quick (bool): use the small sizes
+    Returns:
+        list: one result dictionary per (family, size, stage)
+    """
+    results = []
+    for family in families:
+        pattern, sizes, quick_sizes = FAMILIES[family]
+        for size in quick_sizes if quick else sizes:
+            pattern_stages = PatternStages(pattern(size))
+            counts = pattern_stages.sizes()
+            for stage_name, stage in pattern_stages.stages().items():
+                result = {"family": family, "size": size, "stage": stage_name}
+                result.update(measure(stage, repeat))
+                result.update(counts)
+                results.append(result)
+                print(
+                    f"{family:16} {size:6} {stage_name:20} {result['seconds'] * 1000:10.3f} ms"
+                    f" {result['peak_bytes'] / 1024:10.1f} KiB",
+                    file=sys.stderr,
+                )
+    return results
+
+
+def environment():
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "HEAD"], capture_output=True, text=True, check=True,
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        "commit": commit,
+        "python": platform.python_version(),
+        "implementation": platform.python_implementation(),
+        "platform": platform.platform(),
+        "time": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+    }
+
+
+def compare(results, baseline, threshold, min_seconds=DEFAULT_MIN_SECONDS):
+    """_summary_
+    This function is used to print the stages that got slower than the baseline
+    Args:
+        results (list): the new results
+        baseline (list): the results to compare with
+        threshold (float): the time ratio above which a stage counts as a regression
+        min_seconds (float, optional): stages faster than this in both runs are ignored.
+            Defaults to 1 ms.
+    Returns:
+        int: the number of regressions
+    """
+    old = {(r["family"], r["size"], r["stage"]): r for r in baseline}
+    regressions = 0
+    for result in results:
+        previous = old.get((result["family"], result["size"], result["stage"]))
+        if previous is None or previous["seconds"] <= 0:
+            continue
+        if max(previous["seconds"], result["seconds"]) < min_seconds:
+            continue
+        ratio = result["seconds"] / previous["seconds"]
+        if ratio > threshold:
+            regressions += 1
+            print(
+                f"REGRESSION {result['family']} {result['size']} {result['stage']}:"
+                f" {previous['seconds'] * 1000:.3f} ms -> {result['seconds'] * 1000:.3f} ms"
+                f" ({ratio:.2f}x)"
+            )
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--output", help="write the JSON results to this file (stdout if missing)")
+    parser.add_argument("--repeat", type=int, default=3, help="timed runs of every stage")
+    parser.add_argument(
+        "--family", action="append", choices=sorted(FAMILIES), help="run only these families"
+    )
+    parser.add_argument("--quick", action="store_true", help="use the small sizes only")
+    parser.add_argument("--compare", help="JSON results of a previous run to compare with")
+    parser.add_argument(
+        "--threshold", type=float, default=1.25,
+        help="time ratio reported as a regression by --compare",
+    )
+    parser.add_argument(
+        "--min-seconds", type=float, default=DEFAULT_MIN_SECONDS,
+        help="stages faster than this in both runs are not compared (timer noise)",
+    )
+    args = parser.parse_args()
+
+    results = run(args.family or list(FAMILIES), max(1, args.repeat), args.quick)
+    document = {"version": RESULTS_VERSION, "environment": environment(), "results": results}
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(document, f, indent=4)
+    else:
+        json.dump(document, sys.stdout, indent=4)
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        if compare(results, baseline["results"], args.threshold, args.min_seconds):
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
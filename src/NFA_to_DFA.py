@@ -1,18 +1,62 @@
 from graph_visualize import GraphVisualize
 from json_serialize import JsonSerialize
 from parser_classes import *
-import json
+from adjacency_index import IndexedAutomaton, edge_symbols
+import time
+
+
+class DeterminizationLimitError(Exception):
+    """
+    Error raised when the subset construction goes over one of its limits, with the size of the
+    partial DFA so that the caller can fall back to NFA simulation or reject the pattern
+    """
+    def __init__(self, limit, states, transitions, seconds):
+        # every field is an argument of the exception so that it can be pickled to and from
+        # worker processes
+        super().__init__(limit, states, transitions, seconds)
+        self.limit = limit  # "max_states", "max_transitions" or "max_seconds"
+        self.states = states
+        self.transitions = transitions
+        self.seconds = seconds
+
+    def __str__(self):
+        return (
+            f"Subset construction stopped by {self.limit} after {self.states} DFA states, "
+            f"{self.transitions} transitions and {self.seconds:.3f} seconds"
+        )
 
 
-@dataclass
 class DfaState:
-    name: str = None
+    """
+    State of a DFA, compared and hashed by identity. id is the index of the state in the states
+    list of its DFA and members the NFA states it was built from (subset construction only).
+    The name is derived lazily from them (like "S1,S4,S9" or "S3") unless it is set explicitly
+    """
 
-    def __hash__(self) -> int:
-        return hash(self.name)
+    __slots__ = ("id", "members", "_name")
 
+    def __init__(self, name=None, id=None, members=None):
+        self._name = name
+        self.id = id
+        self.members = members
 
-@dataclass
+    @property
+    def name(self):
+        if self._name is not None:
+            return self._name
+        if self.members is not None:
+            return ",".join([member.name for member in self.members])
+        return f"S{self.id}"
+
+    @name.setter
+    def name(self, name):
+        self._name = name
+
+    def __repr__(self):
+        return f"DfaState({self.name!r})"
+
+
+@dataclass(slots=True)
 class DfaEdge:
     from_: DfaState
     to_: DfaState
@@ -20,24 +64,59 @@ class DfaEdge:
 
 
 @dataclass
-class DFA:
+class DFA(IndexedAutomaton):
     start: DfaState
     accept: list  # list of accepting states
     non_accept: list  # list of non accepting states
     # All states of the DFA including the start and accept
     states: list  # of State
     transitions: list  # of Edge
+    # AlphabetPartition when the symbols of the edges are character classes
+    alphabet: object = None
+    # accepting state -> rule index of the token it accepts (lexer DFAs only)
+    accept_tokens: dict = None
 
 
 class DFA_CLASS:
-    def __init__(self, dfa=None, inputs=[]):
+    def __init__(self, dfa=None, inputs=[], verbose=True):
         """_summary_
         class that contains the methods to convert NFA to DFA
         dfa: DFA object
         inputs: list of inputs of the NFA
+        verbose: print the partitions and transition tables while minimizing
         """
         self._dfa = dfa
         self.inputs = inputs
+        self.verbose = verbose
+        # epsilon closure caches, valid for the adjacency index stored in _closure_index
+        self._closure_index = None
+        # state -> frozenset of the states in its epsilon closure
+        self._state_closures = {}
+        # frozenset of states -> frozenset of the states in the epsilon closure of the whole set
+        self._set_closures = {}
+        # hits and misses of the two closure caches
+        self.state_closure_hits = 0
+        self.state_closure_misses = 0
+        self.set_closure_hits = 0
+        self.set_closure_misses = 0
+        # refinement rounds of the last minimization (Moore rounds or Hopcroft splitters)
+        self.refinement_rounds = 0
+
+    def _use_closure_caches(self, nfa):
+        """_summary_
+        Reset the epsilon closure caches when they were filled for another NFA
+        (or for an older adjacency index of the same NFA)
+        Args:
+            nfa (NFA): the NFA that the closures are computed for
+        Returns:
+            AdjacencyIndex: the adjacency index of the NFA
+        """
+        adjacency = nfa.adjacency
+        if self._closure_index is not adjacency:
+            self._closure_index = adjacency
+            self._state_closures = {}
+            self._set_closures = {}
+        return adjacency
 
     def epsilon_closure(self, nfa, state):
         """_summary_
@@ -47,24 +126,67 @@ class DFA_CLASS:
             state (State): this is the state that we want to get the epsilon closure for
 
         Returns:
-            set: closure set of states that are reachable from the given state using epsilon transitions
+            frozenset: closure set of states that are reachable from the given state using epsilon transitions
         """
+        adjacency = self._use_closure_caches(nfa)
+        closure = self._state_closures.get(state)
+        if closure is not None:
+            self.state_closure_hits += 1
+            return closure
+        self.state_closure_misses += 1
+
+        # iterative depth first search over the epsilon transitions
+        closure = {state}
+        to_visit = [state]
+        while to_visit:
+            current = to_visit.pop()
+            for next_state in adjacency.epsilon_targets(current):
+                if next_state in closure:
+                    continue
+                cached = self._state_closures.get(next_state)
+                if cached is not None:
+                    # the closure of this state is already known, no need to walk it again
+                    closure |= cached
+                else:
+                    closure.add(next_state)
+                    to_visit.append(next_state)
+
+        closure = frozenset(closure)
+        self._state_closures[state] = closure
+        return closure
+
+    def epsilon_closure_of_set(self, nfa, states):
+        """_summary_
+        This function is used to get the epsilon closure of a set of states, the result is
+        cached by the (frozen) set of states so repeated moves to the same set are cache hits
+        Args:
+            nfa (NFA): this a NFA object contains the NFA data
+            states (set): the states that we want to get the epsilon closure for
+
+        Returns:
+            frozenset: closure set of states that are reachable from the given states using epsilon transitions
+        """
+        self._use_closure_caches(nfa)
+        key = frozenset(states)
+        closure = self._set_closures.get(key)
+        if closure is not None:
+            self.set_closure_hits += 1
+            return closure
+        self.set_closure_misses += 1
+
         closure = set()
-        # add the state to its closure set
-        closure.add(state)
-        for edge in nfa.transitions:
-            if edge.from_ == state and EPSILON in edge.characters:
-                # add the state that is reachable using epsilon transition to the closure set
-                closure.add(edge.to_)
-                # call the function recursively to get the epsilon closure of the next state
-                closure = closure.union(self.epsilon_closure(nfa, edge.to_))
+        for state in key:
+            closure |= self.epsilon_closure(nfa, state)
+
+        closure = frozenset(closure)
+        self._set_closures[key] = closure
         return closure
 
-    def move(self, transitions, states, character):
+    def move(self, adjacency, states, character):
         """_summary_
         This function is used to get the move of a given set of states using a given character
         Args:
-            transitions (List): list of transitions of the NFA (list of edges)
+            adjacency (AdjacencyIndex): adjacency index of the NFA (nfa.adjacency)
             states (set): set of states that we want to get the move for. states list is a subset of nfa.states because we apply the input on only a subset
             character (str): the character that we want to move to
 
@@ -73,73 +195,107 @@ class DFA_CLASS:
         """
         move = set()
         for state in states:
-            for edge in transitions:
-                if edge.from_ == state and character in edge.characters:
-                    move.add(edge.to_)
+            move.update(adjacency.targets(state, character))
         return move
 
-    def subset_construction(self, nfa, inputs):
+    def subset_construction(
+        self, nfa, inputs, max_states=None, max_transitions=None, max_seconds=None
+    ):
         """_summary_
         This function is used to convert NFA to DFA using the subset construction algorithm
         Args:
             nfa (NFA): this a NFA object contains the NFA data
             inputs (list): list of inputs of the NFA
+            max_states (int, optional): the most DFA states to build. Defaults to no limit.
+            max_transitions (int, optional): the most DFA transitions to build. Defaults to no limit.
+            max_seconds (float, optional): the most wall time to spend. Defaults to no limit.
+        Raises:
+            DeterminizationLimitError: when the DFA goes over one of the limits
         """
+        started = time.perf_counter()
+        deadline = started + max_seconds if max_seconds is not None else None
+
+        def over_limit(limit):
+            return DeterminizationLimitError(
+                limit, len(states), len(transitions), time.perf_counter() - started
+            )
+
+        adjacency = nfa.adjacency
+        # without epsilon transitions every set of states is its own closure, so the closures
+        # are skipped altogether (Glushkov NFAs and NFAs after remove_epsilons)
+        epsilon_free = not any(adjacency.epsilon.values())
         # get the epsilon closure of the start state
-        start_set = self.epsilon_closure(nfa, nfa.start)
+        if epsilon_free:
+            start_set = frozenset((nfa.start,))
+        else:
+            start_set = self.epsilon_closure(nfa, nfa.start)
         # get the inputs of the NFA
         self.inputs = inputs
         # list of transitions of the DFA
         transitions = []
-        # list of states of the DFA
-        states = []
-        # add the start state to the list of states of the DFA
-        states.append(start_set)
+        # list of states of the DFA, the id of every state is its index
+        states = [DfaState(id=0, members=start_set)]
+        # set of NFA states (frozenset) -> the DFA state that represents it
+        dfa_states = {start_set: states[0]}
         # list of accepting states of the DFA
         accept = []
         # list of non accepting states of the DFA
         non_accept = []
-        # list of states that we need to visit
-        to_visit = [start_set]
-        # while there are states to visit
-        while to_visit:
-            # get the first state in the list of states to visit
-            current_state = to_visit.pop(0)
+        # accepting state -> rule index, when the NFA has tagged accepting states
+        accept_tokens = {} if nfa.accept_tags is not None else None
+        # the states are visited in the order they are discovered, the states after
+        # the visited index are the states that we need to visit
+        visited = 0
+        while visited < len(states):
+            current_state = states[visited]
+            visited += 1
+            if deadline is not None and time.perf_counter() > deadline:
+                raise over_limit("max_seconds")
             # for each input in the inputs list
             for input_ in self.inputs:
                 # get the move of the current state using the input
-                move = self.move(nfa.transitions, current_state, input_)
-                # get the epsilon closure of the move set
-                for state in move:
-                    move = move.union(self.epsilon_closure(nfa, state))
+                move = self.move(adjacency, current_state.members, input_)
                 # if the move set is not empty
-                if move:
+                if not move:
+                    continue
+                # get the epsilon closure of the move set
+                if epsilon_free:
+                    move = frozenset(move)
+                else:
+                    move = self.epsilon_closure_of_set(nfa, move)
+                target = dfa_states.get(move)
+                if target is None:
                     # add the move set to the list of states of the DFA
-                    if move not in states:
-                        states.append(move)
-                        to_visit.append(move)
-                    # add the transition from the current state to the move set using the input
-                    transitions.append(
-                        DfaEdge(from_=current_state, to_=move, characters={input_})
-                    )
+                    if max_states is not None and len(states) >= max_states:
+                        raise over_limit("max_states")
+                    target = DfaState(id=len(states), members=move)
+                    dfa_states[move] = target
+                    states.append(target)
+                if max_transitions is not None and len(transitions) >= max_transitions:
+                    raise over_limit("max_transitions")
+                # add the transition from the current state to the move set using the input
+                transitions.append(DfaEdge(from_=current_state, to_=target, characters={input_}))
 
-        # we need to convert every set of states to a state object
-        for i, state in enumerate(states):
-            temp = state
-            states[i] = DfaState(name=",".join([state.name for state in state]))
-            # loop over the transitions to update the from_ and to_ states
-            for transition in transitions:
-                if transition.from_ == temp:
-                    transition.from_ = states[i]
-                if transition.to_ == temp:
-                    transition.to_ = states[i]
+        for state in states:
+            if nfa.accept_tags is not None:
+                # the state accepts the token of the rule with the highest priority (lowest index)
+                tags = [
+                    nfa.accept_tags[member]
+                    for member in state.members
+                    if member in nfa.accept_tags
+                ]
+                if tags:
+                    accept.append(state)
+                    accept_tokens[state] = min(tags)
+                else:
+                    non_accept.append(state)
             # if the state contains an accepting state of the NFA
-            if temp.intersection({nfa.accept}):
+            elif nfa.accept in state.members:
                 # add the state to the list of accepting states of the DFA
-                accept.append(states[i])
+                accept.append(state)
             else:
                 # add the state to the list of non accepting states of the DFA
-                non_accept.append(states[i])
+                non_accept.append(state)
         # create a DFA object
         self._dfa = DFA(
             start=states[0],
@@ -147,6 +303,8 @@ class DFA_CLASS:
             non_accept=non_accept,
             states=states,
             transitions=transitions,
+            alphabet=getattr(nfa, "alphabet", None),
+            accept_tokens=accept_tokens,
         )
 
     def print_dfa(self):
@@ -168,7 +326,10 @@ class DFA_CLASS:
         This function is used to rename the states of the DFA to S0, S1, S2, ...
         """
         for i, state in enumerate(self._dfa.states):
-            state.name = f"S{i}"
+            # the name is derived from the id once the explicit name and the members are dropped
+            state.id = i
+            state.members = None
+            state.name = None
 
     def dfa_to_json(self, file_path: str):
         """
@@ -180,10 +341,10 @@ class DFA_CLASS:
         """
         json_serialize = JsonSerialize()
         self.dfa_json = json_serialize.dfa_json_serialize(self._dfa)
-        del json_serialize
         # store the dfa json in a file
         with open(file_path, "w") as f:
-            json.dump(self.dfa_json, f, indent=4)
+            json_serialize.write_json(self.dfa_json.items(), f)
+        del json_serialize
 
     def visualize_dfa(self, path="./dfa"):
         """_summary_
@@ -197,31 +358,72 @@ class DFA_CLASS:
             print("Error: Visualization DFA failed")
         del graph_visualize
 
-    def minimize_dfa(self, inputs) -> DFA:
+    def minimize_dfa(self, inputs, algorithm="moore") -> DFA:
         """_summary_
         This function is used to minimize the DFA
         Args:
             inputs (list): list of inputs of the NFA (Terminals in Regex)
+            algorithm (str, optional): "moore" for the round based refinement or "hopcroft"
+                for the splitter worklist refinement. Both give the same minimal DFA. Defaults to "moore".
         Returns:
             DFA: minimized DFA object
         """
-        # the current state of the DFA
+        if algorithm == "moore":
+            pi = self.moore_partition(inputs)
+        elif algorithm == "hopcroft":
+            pi = self.hopcroft_partition(inputs)
+        else:
+            raise ValueError(f"Unknown minimization algorithm: {algorithm}")
+        return self.build_minimized_dfa(pi)
+
+    def initial_partition(self):
+        """_summary_
+        This function is used to get the partition that the minimization starts from: the accepting
+        states (one group per token for lexer DFAs) and the non accepting states
+        Returns:
+            list: list of sets of states
+        """
         pi = []
-        # list of accepting states of the DFA
-        accept = self._dfa.accept
-        if accept:
+        accept_tokens = self._dfa.accept_tokens
+        if accept_tokens is not None:
+            # states that accept different tokens are never equivalent
+            groups = {}
+            for state in self._dfa.accept:
+                groups.setdefault(accept_tokens[state], set()).add(state)
+            pi.extend(groups.values())
+        elif self._dfa.accept:
             # add the accepting states to the current state of the DFA
-            pi.append(set(accept))
-        # list of non accepting states of the DFA
-        non_accept = self._dfa.non_accept
-        if non_accept:
+            pi.append(set(self._dfa.accept))
+        if self._dfa.non_accept:
             # add the non accepting states to the current state of the DFA
-            pi.append(set(non_accept))
-        print("Initial Partition: ", pi)
+            pi.append(set(self._dfa.non_accept))
+        return pi
+
+    def moore_partition(self, inputs):
+        """_summary_
+        This function is used to get the partition of the equivalent states of the DFA by refining
+        the accepting / non accepting partition round by round until no group is split (Moore)
+        Args:
+            inputs (list): list of inputs of the NFA (Terminals in Regex)
+        Returns:
+            list: list of sets of equivalent states
+        """
+        # the current state of the DFA
+        pi = self.initial_partition()
+        log = print if self.verbose else self._quiet
+        log("Initial Partition: ", pi)
+        adjacency = self._dfa.adjacency
         # flag to tell if there is a change in the partition
         change = True
+        self.refinement_rounds = 0
         while change:
             change = False
+            self.refinement_rounds += 1
+            # the index of the group of every state in the current partition
+            group_of = {}
+            for i, group in enumerate(pi):
+                for state in group:
+                    group_of[state] = i
             # create a new partition
             new_pi = []
             for group in pi:
@@ -230,28 +432,25 @@ class DFA_CLASS:
                     # key is the transition table for the state
                     splitted_states = {}
                     for state in group:
-                        # transion table for each state
-                        state_transition_table = {}
+                        # transion table for each state, the group that every input goes to
+                        # (None when there is no transition using the input)
+                        state_transition_table = []
                         for input_ in inputs:
-                            for transition in self._dfa.transitions:
-                                if (
-                                    transition.from_ == state
-                                    and input_ in transition.characters
-                                ):
-                                    if input_ not in state_transition_table:
-                                        state_transition_table[input_] = set()
-                                    state_transition_table[input_].add(transition.to_)
-                        str_temp = str(state_transition_table)
-                        print("Transition Table: ", str_temp)
-                        if str_temp not in splitted_states:
-                            splitted_states[str_temp] = set()
-                        splitted_states[str_temp].add(state)
+                            targets = adjacency.targets(state, input_)
+                            state_transition_table.append(
+                                group_of[targets[0]] if targets else None
+                            )
+                        key = tuple(state_transition_table)
+                        log("Transition Table: ", key)
+                        if key not in splitted_states:
+                            splitted_states[key] = set()
+                        splitted_states[key].add(state)
                     # print("Splitted States: ", splitted_states)
                     # if there is more than one transition table for the group
                     if len(splitted_states) > 1:
                         # change is True to check on the new partitions
                         change = True
-                        print("Splitted States: ", splitted_states)
+                        log("Splitted States: ", splitted_states)
                         # add the splited states to the new partition
                         for value in splitted_states.values():
                             new_pi.append(set(value))
@@ -267,6 +466,107 @@ class DFA_CLASS:
             if change:
                 pi = new_pi
                 # print("New Partition: ", pi)
+        log("Final Partition: ", pi)
+        return pi
+
+    @staticmethod
+    def _quiet(*args):
+        pass
+
+    def hopcroft_partition(self, inputs):
+        """_summary_
+        This function is used to get the partition of the equivalent states of the DFA using
+        Hopcroft's algorithm: a worklist of (splitter group, input) pairs and an inverse transition
+        index, where only the smaller half of every split group is added back to the worklist.
+        Missing transitions go to an implicit dead state that is removed from the result.
+        Args:
+            inputs (list): list of inputs of the NFA (Terminals in Regex)
+        Returns:
+            list: list of sets of equivalent states
+        """
+        adjacency = self._dfa.adjacency
+        states = self._dfa.states
+        # number the states densely, the implicit dead state takes the last number
+        ids = {state: i for i, state in enumerate(states)}
+        dead = len(states)
+
+        # inverse[input_][target] -> list of states that go to target using input_
+        inverse = {}
+        for input_ in inputs:
+            inverse_input = inverse.setdefault(input_, {})
+            for i, state in enumerate(states):
+                targets = adjacency.targets(state, input_)
+                target = ids[targets[0]] if targets else dead
+                inverse_input.setdefault(target, []).append(i)
+            inverse_input.setdefault(dead, []).append(dead)
+
+        # initial partition, the dead state joins the non accepting states
+        blocks = [{ids[state] for state in group} for group in self.initial_partition()]
+        if self._dfa.non_accept:
+            blocks[-1].add(dead)
+        else:
+            blocks.append({dead})
+        block_of = [0] * (dead + 1)
+        for b, block in enumerate(blocks):
+            for i in block:
+                block_of[i] = b
+
+        # every initial group except the largest one is needed as a splitter
+        largest = max(range(len(blocks)), key=lambda b: len(blocks[b]))
+        worklist = [(b, input_) for b in range(len(blocks)) if b != largest for input_ in inputs]
+        in_worklist = set(worklist)
+
+        self.refinement_rounds = 0
+        while worklist:
+            splitter = worklist.pop()
+            self.refinement_rounds += 1
+            in_worklist.discard(splitter)
+            b, input_ = splitter
+            inverse_input = inverse[input_]
+
+            # group the states that go into the splitter using input_ by their current group
+            touched = {}
+            for target in blocks[b]:
+                for source in inverse_input.get(target, ()):
+                    touched.setdefault(block_of[source], []).append(source)
+
+            for y, members in touched.items():
+                if len(members) == len(blocks[y]):
+                    continue
+                # split group y into the states that go into the splitter and the rest
+                new_block = set(members)
+                blocks[y] -= new_block
+                new_b = len(blocks)
+                blocks.append(new_block)
+                for i in new_block:
+                    block_of[i] = new_b
+
+                for c in inputs:
+                    if (y, c) in in_worklist:
+                        pair = (new_b, c)
+                    elif len(new_block) <= len(blocks[y]):
+                        pair = (new_b, c)
+                    else:
+                        pair = (y, c)
+                    worklist.append(pair)
+                    in_worklist.add(pair)
+
+        # drop the dead state and order the groups by their first state to keep the naming stable
+        pi = []
+        for block in sorted(blocks, key=min):
+            block.discard(dead)
+            if block:
+                pi.append({states[i] for i in block})
+        return pi
+
+    def build_minimized_dfa(self, pi):
+        """_summary_
+        This function is used to build the minimized DFA from a partition of the equivalent states
+        Args:
+            pi (list): list of sets of equivalent states of the DFA
+        Returns:
+            DFA: minimized DFA object
+        """
         # list of states of the minimized DFA
         min_states = []
         # list of transitions of the minimized DFA
@@ -275,30 +575,44 @@ class DFA_CLASS:
         min_accept = []
         # list of non accepting states of the minimized DFA
         min_non_accept = []
+        # accepting state -> rule index, for lexer DFAs
+        accept_tokens = self._dfa.accept_tokens
+        min_accept_tokens = {} if accept_tokens is not None else None
         # start state of the minimized DFA
         start = None
-        print("Final Partition: ", pi)
+        # the index of the group of every state of the DFA
+        group_of = {}
         # create the state sof the minimized DFA
         for i, group in enumerate(pi):
-            state = DfaState(name=f"S{i}")
+            for member in group:
+                group_of[member] = i
+            state = DfaState(id=i)
             min_states.append(state)
             if group.intersection(self._dfa.accept):
                 min_accept.append(state)
+                if accept_tokens is not None:
+                    min_accept_tokens[state] = accept_tokens[next(iter(group))]
             else:
                 min_non_accept.append(state)
             # get the start state of the minimized DFA
             if self._dfa.start in group:
                 start = state
-        # create the transitions of the minimized DFA
+        # create the transitions of the minimized DFA, the states of a group go to the same groups
+        # so only the first edge of every (group, symbol) is kept
+        seen = set()
         for transition in self._dfa.transitions:
-            for i, group in enumerate(pi):
-                if transition.from_ in group:
-                    from_ = min_states[i]
-                if transition.to_ in group:
-                    to_ = min_states[i]
-            min_transitions.append(
-                DfaEdge(from_=from_, to_=to_, characters=transition.characters)
-            )
+            from_id = group_of[transition.from_]
+            for symbol in edge_symbols(transition.characters):
+                if (from_id, symbol) in seen:
+                    continue
+                seen.add((from_id, symbol))
+                min_transitions.append(
+                    DfaEdge(
+                        from_=min_states[from_id],
+                        to_=min_states[group_of[transition.to_]],
+                        characters={symbol},
+                    )
+                )
         # create a DFA object for the minimized DFA
         minimized_dfa = DFA(
             start=start,
@@ -306,5 +620,7 @@ class DFA_CLASS:
             non_accept=min_non_accept,
             states=min_states,
             transitions=min_transitions,
+            alphabet=self._dfa.alphabet,
+            accept_tokens=min_accept_tokens,
         )
         return minimized_dfa
@@ -0,0 +1,96 @@
+from parser_classes import EPSILON
+
+
+def edge_symbols(characters):
+    """_summary_
+    Edges built by NFA_CLASS carry a single symbol string, while deserialized and DFA edges
+    carry a set of symbols, this function returns the symbols of an edge in both cases
+    Args:
+        characters (str | set): the characters attribute of an edge
+
+    Returns:
+        iterable: the symbols of the edge
+    """
+    if isinstance(characters, str):
+        return (characters,)
+    return characters
+
+
+class AdjacencyIndex:
+    __slots__ = ("symbols", "epsilon")
+
+    def __init__(self, states, transitions):
+        """_summary_
+        Per-state adjacency index of an automaton, built once from its flat list of edges
+        so the algorithms do not have to scan every edge for every state and symbol
+        Args:
+            states (list): all the states of the automaton
+            transitions (list): list of edges of the automaton (from_, to_, characters)
+        """
+        # state -> {symbol -> list of target states}
+        self.symbols = {}
+        # state -> list of states reachable using a single epsilon transition
+        self.epsilon = {}
+
+        for state in states:
+            self.symbols[state] = {}
+            self.epsilon[state] = []
+
+        for edge in transitions:
+            for symbol in edge_symbols(edge.characters):
+                if symbol == EPSILON:
+                    self.epsilon.setdefault(edge.from_, []).append(edge.to_)
+                else:
+                    self.symbols.setdefault(edge.from_, {}).setdefault(symbol, []).append(
+                        edge.to_
+                    )
+
+    def targets(self, state, symbol):
+        """_summary_
+        Args:
+            state (State): the state to move from
+            symbol (str): the input symbol
+
+        Returns:
+            list: states reachable from the given state using the given symbol
+        """
+        return self.symbols.get(state, {}).get(symbol, ())
+
+    def epsilon_targets(self, state):
+        """_summary_
+        Args:
+            state (State): the state to move from
+
+        Returns:
+            list: states reachable from the given state using a single epsilon transition
+        """
+        return self.epsilon.get(state, ())
+
+    def outgoing(self, state):
+        """_summary_
+        Args:
+            state (State): the state to move from
+
+        Returns:
+            dict: symbol -> list of target states, epsilon transitions excluded
+        """
+        return self.symbols.get(state, {})
+
+
+class IndexedAutomaton:
+    """
+    Mixin for the NFA and DFA data objects that gives them an adjacency index built once
+    on first use. Call build_adjacency() again after mutating states or transitions.
+    """
+
+    _adjacency = None
+
+    @property
+    def adjacency(self):
+        if self._adjacency is None:
+            self.build_adjacency()
+        return self._adjacency
+
+    def build_adjacency(self):
+        self._adjacency = AdjacencyIndex(self.states, self.transitions)
+        return self._adjacency
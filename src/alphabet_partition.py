@@ -0,0 +1,186 @@
+from parser_classes import EPSILON, ANY_CHARACTER, symbol_ranges
+from adjacency_index import edge_symbols
+from regex_to_NFA import NFA, Edge
+from dfa_matcher import classify
+
+
+class AlphabetPartition:
+    def __init__(self, symbols):
+        """_summary_
+        Partition of the characters used by the symbols of an automaton (single characters,
+        ranges like 'a-z' and the ANY_CHARACTER wildcard) into disjoint equivalence classes: two characters
+        are in the same class when exactly the same symbols match them, so every class can be used
+        as one input of the subset construction and as one column of a compiled DFA
+        Args:
+            symbols (iterable): the edge symbols of the automaton (epsilon is ignored)
+        """
+        symbols = list(dict.fromkeys(s for s in symbols if s != EPSILON))
+
+        # sweep over the code points where the set of matching symbols changes
+        events = {}
+        for symbol in symbols:
+            for first, last in symbol_ranges(symbol):
+                events.setdefault(first, []).append((1, symbol))
+                events.setdefault(last + 1, []).append((-1, symbol))
+
+        # signature (frozenset of the matching symbols) -> class id
+        class_of_signature = {}
+        signatures = []
+        # code point ranges of every class
+        self.ranges = []
+        # sorted code points where the class changes, and the class from each of them on (-1 for no class)
+        self.boundaries = []
+        self.boundary_columns = []
+
+        active = {}
+        cuts = sorted(events)
+        for i, cut in enumerate(cuts):
+            for delta, symbol in events[cut]:
+                active[symbol] = active.get(symbol, 0) + delta
+                if active[symbol] == 0:
+                    del active[symbol]
+
+            if not active:
+                class_id = -1
+            else:
+                signature = frozenset(active)
+                class_id = class_of_signature.get(signature)
+                if class_id is None:
+                    class_id = len(self.ranges)
+                    class_of_signature[signature] = class_id
+                    signatures.append(signature)
+                    self.ranges.append([])
+                self.ranges[class_id].append((cut, cuts[i + 1] - 1))
+
+            if self.boundary_columns and self.boundary_columns[-1] == class_id:
+                # adjacent intervals of the same class
+                continue
+            self.boundaries.append(cut)
+            self.boundary_columns.append(class_id)
+
+        # readable and unique label of every class, used as the input symbol of the class
+        self.labels = []
+        used_labels = {EPSILON}
+        for class_id, ranges in enumerate(self.ranges):
+            if signatures[class_id] == frozenset({ANY_CHARACTER}):
+                # only the wildcard matches these characters
+                label = ANY_CHARACTER
+            else:
+                label = ",".join(
+                    chr(first) if first == last else f"{chr(first)}-{chr(last)}"
+                    for first, last in ranges
+                )
+            if label in used_labels:
+                label = f"{label}#{class_id}"
+            used_labels.add(label)
+            self.labels.append(label)
+
+        # symbol -> labels of the classes that the symbol matches
+        self.symbol_classes = {symbol: [] for symbol in symbols}
+        for class_id, signature in enumerate(signatures):
+            for symbol in signature:
+                self.symbol_classes[symbol].append(self.labels[class_id])
+
+    @classmethod
+    def from_label_ranges(cls, label_ranges):
+        """_summary_
+        This function is used to rebuild a partition from the classes written by label_ranges(),
+        every label is its own symbol
+        Args:
+            label_ranges (dict): class label -> list of [first, last] code point ranges
+        Returns:
+            AlphabetPartition: the partition with the same classes and labels
+        """
+        partition = cls.__new__(cls)
+        partition.labels = list(label_ranges)
+        partition.ranges = [
+            [(first, last) for first, last in ranges] for ranges in label_ranges.values()
+        ]
+        partition.symbol_classes = {label: [label] for label in partition.labels}
+
+        partition.boundaries = []
+        partition.boundary_columns = []
+        end = 0
+        for first, last, class_id in sorted(
+            (first, last, class_id)
+            for class_id, ranges in enumerate(partition.ranges)
+            for first, last in ranges
+        ):
+            if first < end:
+                raise ValueError("The classes of the alphabet overlap")
+            if first > end:
+                # gap of characters in no class
+                partition.boundaries.append(end)
+                partition.boundary_columns.append(-1)
+            partition.boundaries.append(first)
+            partition.boundary_columns.append(class_id)
+            end = last + 1
+        partition.boundaries.append(end)
+        partition.boundary_columns.append(-1)
+        return partition
+
+    def label_ranges(self):
+        """
+        Class label -> list of [first, last] code point ranges of the class, JSON friendly
+        """
+        return {
+            label: [[first, last] for first, last in ranges]
+            for label, ranges in zip(self.labels, self.ranges)
+        }
+
+    @classmethod
+    def from_nfa(cls, nfa):
+        """_summary_
+        Args:
+            nfa (NFA): the NFA data object
+        Returns:
+            AlphabetPartition: the partition of the characters used by the edges of the NFA
+        """
+        return cls(
+            symbol
+            for transition in nfa.transitions
+            for symbol in edge_symbols(transition.characters)
+        )
+
+    @property
+    def inputs(self):
+        """
+        The input symbols (class labels) to use in the subset construction
+        """
+        return list(self.labels)
+
+    def classify(self, char):
+        """_summary_
+        Args:
+            char (str): a character of the input
+        Returns:
+            int: the class id of the character, -1 if no symbol matches it
+        """
+        return classify(self.boundaries, self.boundary_columns, char)
+
+    def apply(self, nfa):
+        """_summary_
+        This function is used to rewrite the edges of the NFA to use the class labels as symbols,
+        a symbol that matches several classes becomes one edge per class
+        Args:
+            nfa (NFA): the NFA data object
+        Returns:
+            NFA: a new NFA with the same states, whose alphabet is this partition
+        """
+        transitions = []
+        for transition in nfa.transitions:
+            for symbol in edge_symbols(transition.characters):
+                if symbol == EPSILON:
+                    transitions.append(Edge(transition.from_, transition.to_, EPSILON))
+                    continue
+                for label in self.symbol_classes[symbol]:
+                    transitions.append(Edge(transition.from_, transition.to_, label))
+
+        return NFA(
+            nfa.start,
+            nfa.accept,
+            nfa.states,
+            transitions,
+            alphabet=self,
+            accept_tags=nfa.accept_tags,
+        )
@@ -0,0 +1,89 @@
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from compile_cache import CompileCache
+from dfa_matcher import CompiledDFA
+from NFA_to_DFA import DeterminizationLimitError
+from pipeline import compile_regex
+
+
+@dataclass
+class BatchResult:
+    regex: str
+    compiled: CompiledDFA  # None when the compile failed or the DFA was written to the cache
+    seconds: float  # compile time of the pattern in its worker process
+    error: str = None  # "ExceptionType: message" when the compile failed
+    path: str = None  # the cache file of the DFA when compiling to a cache directory
+    # the limit, states, transitions and seconds when the DFA went over a limit
+    limit_error: DeterminizationLimitError = None
+
+    @property
+    def ok(self):
+        return self.error is None
+
+
+def _compile_one(job):
+    """_summary_
+    This function is used to compile one pattern in a worker process
+    Args:
+        job (tuple): (regex, cache directory or None, build options of compile_regex)
+    Returns:
+        BatchResult: the result of the pattern
+    """
+    regex, cache_dir, options = job
+    start = time.perf_counter()
+    try:
+        if cache_dir is None:
+            compiled = compile_regex(regex, **options).compiled
+            path = None
+        else:
+            # the memory cache of the worker is not needed, only the file
+            cache = CompileCache(cache_dir, max_bytes=0)
+            cache.get(regex, **options)
+            compiled = None
+            path = cache.path(cache.key_for(regex, **options))
+    except DeterminizationLimitError as e:
+        return BatchResult(
+            regex, None, time.perf_counter() - start, f"{type(e).__name__}: {e}", limit_error=e
+        )
+    except Exception as e:
+        return BatchResult(regex, None, time.perf_counter() - start, f"{type(e).__name__}: {e}")
+    return BatchResult(regex, compiled, time.perf_counter() - start, path=path)
+
+
+def batch_compile(
+    regexes, algorithm="hopcroft", max_workers=None, cache_dir=None, chunksize=None, **options
+):
+    """_summary_
+    This function is used to compile many independent patterns in parallel over a pool of
+    processes, a pattern that fails does not stop the others
+    Args:
+        regexes (list): the regular expressions
+        algorithm (str, optional): the DFA minimization algorithm. Defaults to "hopcroft".
+        max_workers (int, optional): number of worker processes. Defaults to the number of CPUs.
+        cache_dir (str, optional): write the compiled DFAs to this CompileCache directory instead of
+            sending them back to the calling process. Defaults to None.
+        chunksize (int, optional): patterns sent to a worker at a time. Defaults to a few chunks per worker.
+        **options: the other build options of compile_regex (construction, eliminate_epsilons and
+            the max_states, max_transitions and max_seconds limits of the subset construction), a
+            pattern over a limit fails with a DeterminizationLimitError kept in its limit_error
+    Returns:
+        list: a BatchResult for every regex, in the order of the regexes
+    """
+    regexes = list(regexes)
+    if not regexes:
+        return []
+    if max_workers is None:
+        max_workers = os.cpu_count() or 1
+    max_workers = min(max_workers, len(regexes))
+    if chunksize is None:
+        chunksize = max(1, len(regexes) // (max_workers * 4))
+    if cache_dir is not None:
+        # create the directory once instead of in every worker at the same time
+        os.makedirs(cache_dir, exist_ok=True)
+
+    options = {"algorithm": algorithm, **options}
+    jobs = [(regex, cache_dir, options) for regex in regexes]
+    with ProcessPoolExecutor(max_workers=max_workers) as executor:
+        return list(executor.map(_compile_one, jobs, chunksize=chunksize))
@@ -0,0 +1,110 @@
+import numpy as np
+from dfa_matcher import DEAD_STATE, NOT_ACCEPTING
+
+
+class BatchMatcher:
+    def __init__(self, compiled):
+        """_summary_
+        Matcher that runs a CompiledDFA over many strings at once with NumPy: all the strings are
+        advanced in lockstep, one character position per step, using the transition table as a
+        2D array with an extra dead state, a column for characters without a transition and a
+        padding column for the positions after the end of the shorter strings
+        Args:
+            compiled (CompiledDFA): the compiled DFA
+        """
+        self.compiled = compiled
+        num_states = compiled.num_states
+        num_columns = compiled.num_columns
+
+        # the dead state is the last row, unknown characters use the column after the DFA columns
+        # and lead to the dead state, and the padding after the end of a string uses the last
+        # column where every state stays where it is
+        self.dead = num_states
+        self.unknown_column = num_columns
+        self.padding_column = num_columns + 1
+        table = np.full((num_states + 1, num_columns + 2), self.dead, dtype=np.int32)
+        if num_columns:
+            flat = np.frombuffer(compiled.table, dtype=np.int32).reshape(num_states, num_columns)
+            table[:num_states, :num_columns] = np.where(flat == DEAD_STATE, self.dead, flat)
+        table[:, self.padding_column] = np.arange(num_states + 1)
+        self.table = table
+
+        accepting = np.zeros(num_states + 1, dtype=bool)
+        accepting[:num_states] = np.frombuffer(compiled.accept, dtype=np.int32) != NOT_ACCEPTING
+        self.accepting = accepting
+
+        # code point -> column for the Latin-1 range, other characters are looked up one by one
+        self._latin1_columns = np.array(
+            [self._column(chr(code)) for code in range(256)], dtype=np.int32
+        )
+
+    def _column(self, char):
+        column = self.compiled.column(char)
+        return column if column >= 0 else self.unknown_column
+
+    def encode(self, strings):
+        """_summary_
+        This function is used to build the padded matrix of columns of the strings
+        Args:
+            strings (list): the input strings
+        Returns:
+            tuple: (columns, lengths) the int32 matrix of shape (len(strings), longest length) and
+                the length of every string
+        """
+        lengths = np.fromiter(map(len, strings), dtype=np.int64, count=len(strings))
+        width = int(lengths.max()) if len(strings) else 0
+        columns = np.full((len(strings), width), self.padding_column, dtype=np.int32)
+        if not lengths.any():
+            return columns, lengths
+
+        # code points of all the strings at once, one byte each when all of them are Latin-1
+        joined = "".join(strings)
+        try:
+            codes = np.frombuffer(joined.encode("latin-1"), dtype=np.uint8)
+            flat = self._latin1_columns[codes]
+        except UnicodeEncodeError:
+            codes = np.frombuffer(joined.encode("utf-32-le"), dtype=np.uint32)
+            flat = np.empty(len(codes), dtype=np.int32)
+            latin1 = codes < 256
+            flat[latin1] = self._latin1_columns[codes[latin1]]
+            others, inverse = np.unique(codes[~latin1], return_inverse=True)
+            other_columns = np.array([self._column(chr(code)) for code in others], dtype=np.int32)
+            flat[~latin1] = other_columns[inverse]
+
+        # the characters fill every row from its start, in the order of the joined string
+        columns[np.arange(width) < lengths[:, None]] = flat
+        return columns, lengths
+
+    def fullmatch(self, strings):
+        """_summary_
+        This function is used to check which strings the DFA accepts as a whole
+        Args:
+            strings (list): the input strings
+        Returns:
+            numpy.ndarray: boolean vector, True for every string accepted by the DFA
+        """
+        columns, lengths = self.encode(strings)
+        return self.fullmatch_columns(columns, lengths)
+
+    def fullmatch_columns(self, columns, lengths=None):
+        """_summary_
+        This function is used to run the DFA over an already encoded matrix of columns
+        Args:
+            columns (numpy.ndarray): int matrix of the columns of the characters, one string per row,
+                padded with padding_column after the end of every string
+            lengths (numpy.ndarray, optional): the length of every string, used to stop early. Defaults to None.
+        Returns:
+            numpy.ndarray: boolean vector, True for every string accepted by the DFA
+        """
+        # flat view of the table, the next state is flat_table[state * row_size + column]
+        flat_table = self.table.ravel()
+        row_size = self.table.shape[1]
+        width = columns.shape[1]
+        if lengths is not None and len(lengths):
+            width = min(width, int(lengths.max()))
+        states = np.full(columns.shape[0], self.compiled.start, dtype=np.int32)
+        # one position of all the strings per step, the padding keeps finished strings in place
+        positions = np.ascontiguousarray(columns[:, :width].T)
+        for position in range(width):
+            states = flat_table[states * row_size + positions[position]]
+        return self.accepting[states]
@@ -0,0 +1,155 @@
+import hashlib
+import json
+import os
+import tempfile
+from collections import OrderedDict
+from dfa_matcher import CompiledDFA
+from pipeline import compile_regex
+
+# Part of every cache key, bump it when the compiled format or the compile pipeline changes
+ENGINE_VERSION = "2"
+# Options of compile_regex, filled in so that a default and an explicit value share a key
+DEFAULT_OPTIONS = {
+    "algorithm": "hopcroft",
+    "construction": "thompson",
+    "eliminate_epsilons": False,
+}
+# Limits of the subset construction, they only decide whether a compile is allowed to finish and
+# not what it builds, so they are applied on a miss and left out of the keys
+LIMIT_OPTIONS = ("max_states", "max_transitions", "max_seconds")
+
+
+class CompileCache:
+    def __init__(self, directory=None, max_bytes=64 * 1024 * 1024):
+        """_summary_
+        Cache of compiled DFAs keyed by the regex, the engine version and the build options: an
+        in-process LRU cache bounded by the size of the compiled tables, backed by an optional
+        directory on disk that survives restarts
+        Args:
+            directory (str, optional): directory of the disk cache, no disk cache if None. Defaults to None.
+            max_bytes (int, optional): the most bytes of compiled tables kept in memory. Defaults to 64 MiB.
+        """
+        self.directory = directory
+        self.max_bytes = max_bytes
+        # key -> (compiled DFA, size in bytes), least recently used first
+        self._entries = OrderedDict()
+        self._size = 0
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        if directory is not None:
+            os.makedirs(directory, exist_ok=True)
+
+    @staticmethod
+    def key(regex, options):
+        """_summary_
+        Args:
+            regex (str): the regular expression
+            options (dict): the build options
+        Returns:
+            str: hex digest identifying the compiled DFA
+        """
+        data = json.dumps(
+            {"regex": regex, "engine": ENGINE_VERSION, "options": options}, sort_keys=True
+        )
+        return hashlib.sha256(data.encode("utf-8")).hexdigest()
+
+    @classmethod
+    def key_for(cls, regex, **options):
+        """_summary_
+        Args:
+            regex (str): the regular expression
+            **options: the build options passed to get()
+        Returns:
+            str: the key that get() stores the compiled DFA under (the same for any limits)
+        """
+        options = {
+            name: value for name, value in options.items() if name not in LIMIT_OPTIONS
+        }
+        return cls.key(regex, {**DEFAULT_OPTIONS, **options})
+
+    def get(self, regex, **options):
+        """_summary_
+        This function is used to get the compiled DFA of a regex, from memory, from disk or by
+        compiling it (and storing it in both)
+        Args:
+            regex (str): the regular expression
+            **options: the build options passed to compile_regex, the limits of the subset
+                construction only apply when the regex is compiled
+        Returns:
+            CompiledDFA: the compiled matcher
+        Raises:
+            DeterminizationLimitError: when the regex is compiled and goes over one of the limits
+        """
+        key = self.key_for(regex, **options)
+        entry = self._entries.get(key)
+        if entry is not None:
+            self.hits += 1
+            self._entries.move_to_end(key)
+            return entry[0]
+
+        compiled = self._load(key)
+        if compiled is not None:
+            self.disk_hits += 1
+        else:
+            self.misses += 1
+            compiled = compile_regex(regex, **{**DEFAULT_OPTIONS, **options}).compiled
+            self._store(key, compiled)
+        self._remember(key, compiled)
+        return compiled
+
+    def _remember(self, key, compiled):
+        """
+        Add a compiled DFA to the memory cache, evicting the least recently used ones
+        """
+        size = compiled.nbytes
+        self._entries[key] = (compiled, size)
+        self._size += size
+        while self._size > self.max_bytes and len(self._entries) > 1:
+            _, (_, evicted_size) = self._entries.popitem(last=False)
+            self._size -= evicted_size
+
+    def path(self, key):
+        """
+        Path of the disk cache file of a key
+        """
+        return os.path.join(self.directory, f"{key}.dfa")
+
+    def _load(self, key):
+        """
+        Read a compiled DFA from the disk cache, None if it is not there
+        """
+        if self.directory is None:
+            return None
+        try:
+            # read into memory instead of mapping, a mapping keeps a file descriptor open for as
+            # long as the DFA lives and a cache holds many DFAs
+            return CompiledDFA.load(self.path(key), use_mmap=False)
+        except FileNotFoundError:
+            return None
+        except ValueError:
+            # empty or corrupted file, compiled again and replaced
+            return None
+
+    def _store(self, key, compiled):
+        """
+        Write a compiled DFA to the disk cache, the file is renamed into place so concurrent
+        readers never see a partial file
+        """
+        if self.directory is None:
+            return
+        fd, temp_path = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(compiled.to_bytes())
+            os.replace(temp_path, self.path(key))
+        except BaseException:
+            os.unlink(temp_path)
+            raise
+
+    def clear(self):
+        """
+        Drop the memory cache (the disk cache is kept)
+        """
+        self._entries.clear()
+        self._size = 0
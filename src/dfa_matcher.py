@@ -0,0 +1,399 @@
+import mmap
+import struct
+import sys
+from array import array
+from bisect import bisect_right
+from adjacency_index import edge_symbols
+from parser_classes import symbol_ranges
+
+# Value of the transition table for a missing transition
+DEAD_STATE = -1
+# Token id of a non accepting state
+NOT_ACCEPTING = -1
+
+# Binary format: a fixed header followed by int32 sections for the transition table, the token id
+# of every state, the column boundaries and the column of every boundary
+BINARY_MAGIC = b"CDFA"
+BINARY_VERSION = 1
+# magic, version, byte order (0 little, 1 big), num_states, num_columns, start, num_boundaries
+BINARY_HEADER = struct.Struct("<4sIIIIiI")
+
+
+def classify(boundaries, boundary_columns, char):
+    """_summary_
+    Args:
+        boundaries (list): sorted code points where the column of the characters changes
+        boundary_columns (list): the column of the code points in [boundaries[i], boundaries[i + 1])
+        char (str): a character of the input
+    Returns:
+        int: the column of the character, DEAD_STATE if it is before the first boundary
+    """
+    index = bisect_right(boundaries, ord(char)) - 1
+    return boundary_columns[index] if index >= 0 else DEAD_STATE
+
+
+class Matcher:
+    """
+    Matching surface shared by CompiledDFA, LazyDFA and NfaSimulator. A matcher sets boundaries,
+    boundary_columns and an empty _columns dictionary, and implements start_state(), step() and
+    token() over its own kind of state (dead_state when no transition is left). The scan loop can
+    be overridden with a faster one
+    """
+
+    dead_state = DEAD_STATE
+
+    def start_state(self):
+        raise NotImplementedError
+
+    def step(self, state, column):
+        """_summary_
+        Args:
+            state: the current state
+            column (int): the column (character class) of the input character
+        Returns:
+            the next state, dead_state if there is none
+        """
+        raise NotImplementedError
+
+    def token(self, state):
+        """_summary_
+        Args:
+            state: a state of the matcher
+        Returns:
+            int: the token accepted by the state, NOT_ACCEPTING if the state does not accept
+        """
+        raise NotImplementedError
+
+    def column(self, char):
+        """_summary_
+        Args:
+            char (str): a character of the input
+        Returns:
+            int: the column of the character (DEAD_STATE if no transition uses it)
+        """
+        column = self._columns.get(char)
+        if column is None:
+            column = classify(self.boundaries, self.boundary_columns, char)
+            self._columns[char] = column
+        return column
+
+    def fullmatch(self, text):
+        """_summary_
+        Args:
+            text (str): the input string
+        Returns:
+            bool: True if the whole string is accepted
+        """
+        match = self.longest_match(text)
+        return match is not None and match[0] == len(text)
+
+    def match_prefix(self, text, pos=0):
+        """_summary_
+        This function is used to find the longest accepted prefix of text[pos:]
+        Args:
+            text (str): the input string
+            pos (int, optional): where the match starts. Defaults to 0.
+        Returns:
+            int: the end of the longest match (pos for an empty match), None if there is no match
+        """
+        match = self.longest_match(text, pos)
+        return match[0] if match is not None else None
+
+    def longest_match(self, text, pos=0):
+        """_summary_
+        This function is used to find the longest accepted prefix of text[pos:] together with the
+        token accepted at its end
+        Args:
+            text (str): the input string
+            pos (int, optional): where the match starts. Defaults to 0.
+        Returns:
+            tuple: (end, token id) of the longest match, None if there is no match
+        """
+        state = self.start_state()
+        token = self.token(state)
+        match = (pos, token) if token != NOT_ACCEPTING else None
+        return self.scan(state, text, pos, match)
+
+    def scan(self, state, text, pos, match=None):
+        """_summary_
+        This function is used to continue a longest match scan from a state
+        Args:
+            state: the current state
+            text (str): the input string
+            pos (int): the position of the next character
+            match (tuple, optional): the (end, token id) of the longest match so far. Defaults to None.
+        Returns:
+            tuple: (end, token id) of the longest match, None if there is no match
+        """
+        dead_state = self.dead_state
+        for i in range(pos, len(text)):
+            column = self.column(text[i])
+            if column < 0:
+                break
+            state = self.step(state, column)
+            if state == dead_state:
+                break
+            token = self.token(state)
+            if token != NOT_ACCEPTING:
+                match = (i + 1, token)
+        return match
+
+
+class CompiledDFA(Matcher):
+    def __init__(self, table, num_columns, start, accept, boundaries, boundary_columns):
+        """_summary_
+        DFA matcher that runs on a flat integer transition table instead of DfaState / DfaEdge objects
+        Args:
+            table (array): flat array('i') of size num_states * num_columns, the next state of
+                state s using column c is table[s * num_columns + c] (DEAD_STATE if there is none)
+            num_columns (int): number of input columns (character classes) of the table
+            start (int): the start state
+            accept (array): array('i') with the token id of every state (NOT_ACCEPTING if the state does not accept)
+            boundaries (list): sorted code points where the column of the characters changes
+            boundary_columns (list): the column of the code points in [boundaries[i], boundaries[i + 1])
+                (DEAD_STATE for characters that no transition uses)
+        """
+        self.table = table
+        self.num_columns = num_columns
+        self.start = start
+        self.accept = accept
+        self.boundaries = boundaries
+        self.boundary_columns = boundary_columns
+        # character -> column, filled the first time a character is seen
+        self._columns = {}
+
+    @property
+    def num_states(self):
+        return len(self.accept)
+
+    @property
+    def nbytes(self):
+        """
+        Approximate memory used by the tables of the matcher
+        """
+        return (
+            len(self.table) * self.table.itemsize
+            + len(self.accept) * self.accept.itemsize
+            + (len(self.boundaries) + len(self.boundary_columns)) * 8
+        )
+
+    def __getstate__(self):
+        # the character -> column cache is rebuilt on use, and tables loaded from a file are
+        # memoryviews that cannot be pickled
+        state = self.__dict__.copy()
+        state["_columns"] = {}
+        for name in ("table", "accept", "boundaries", "boundary_columns"):
+            if isinstance(state[name], memoryview):
+                state[name] = array("i", state[name])
+        return state
+
+    def to_bytes(self):
+        """_summary_
+        This function is used to serialize the matcher in the binary format
+        Returns:
+            bytes: the header followed by the int32 sections
+        """
+        header = BINARY_HEADER.pack(
+            BINARY_MAGIC,
+            BINARY_VERSION,
+            sys.byteorder == "big",
+            self.num_states,
+            self.num_columns,
+            self.start,
+            len(self.boundaries),
+        )
+        sections = [header]
+        for values in (self.table, self.accept, self.boundaries, self.boundary_columns):
+            if isinstance(values, list):
+                values = array("i", values)
+            sections.append(values.tobytes())
+        return b"".join(sections)
+
+    def save(self, file_path):
+        """_summary_
+        This function is used to write the matcher to a binary file that load() maps back
+        Args:
+            file_path (str): path of the output file
+        """
+        with open(file_path, "wb") as f:
+            f.write(self.to_bytes())
+
+    @classmethod
+    def from_buffer(cls, buffer, validate=False):
+        """_summary_
+        This function is used to build a matcher directly on a buffer in the binary format, the
+        tables are int32 views of the buffer so nothing is copied or parsed
+        Args:
+            buffer: bytes, mmap or any other buffer holding the binary format
+            validate (bool, optional): also check that the transitions and the columns are in
+                range, one pass that reads the whole table. The header, the size and the start
+                state are always checked. Defaults to False.
+        Returns:
+            CompiledDFA: the matcher
+        """
+        view = memoryview(buffer)
+        if len(view) < BINARY_HEADER.size:
+            raise ValueError("The buffer is too short to hold a compiled DFA")
+        magic, version, big_endian, num_states, num_columns, start, num_boundaries = (
+            BINARY_HEADER.unpack_from(view)
+        )
+        if magic != BINARY_MAGIC:
+            raise ValueError("The buffer does not hold a compiled DFA")
+        if version != BINARY_VERSION:
+            raise ValueError(f"Unsupported compiled DFA version {version}")
+
+        sizes = (num_states * num_columns, num_states, num_boundaries, num_boundaries)
+        if len(view) != BINARY_HEADER.size + 4 * sum(sizes):
+            raise ValueError("The size of the buffer does not match its header")
+        swap = big_endian != (sys.byteorder == "big")
+        sections = []
+        offset = BINARY_HEADER.size
+        for size in sizes:
+            section = view[offset : offset + 4 * size]
+            if swap:
+                # written on a machine with the other byte order, fall back to a copy
+                values = array("i")
+                values.frombytes(section)
+                values.byteswap()
+            else:
+                values = section.cast("i")
+            sections.append(values)
+            offset += 4 * size
+        table, accept, boundaries, boundary_columns = sections
+        if not 0 <= start < num_states:
+            raise ValueError(f"The start state {start} is not a state of the compiled DFA")
+        if validate:
+            if len(table) and not (DEAD_STATE <= min(table) and max(table) < num_states):
+                raise ValueError("The transition table of the compiled DFA has unknown states")
+            if len(boundary_columns) and not (
+                DEAD_STATE <= min(boundary_columns) and max(boundary_columns) < num_columns
+            ):
+                raise ValueError("The boundaries of the compiled DFA have unknown columns")
+        return cls(table, num_columns, start, accept, boundaries, boundary_columns)
+
+    @classmethod
+    def load(cls, file_path, use_mmap=True, validate=False):
+        """_summary_
+        This function is used to load a matcher written by save()
+        Args:
+            file_path (str): path of the binary file
+            use_mmap (bool, optional): map the file into memory instead of reading it, the pages
+                of the table are then read only when the matcher uses them, but the mapping keeps
+                a file descriptor open as long as the matcher lives. Defaults to True.
+            validate (bool, optional): check that the transitions and columns of the tables are
+                in range, this reads the whole file. Defaults to False.
+        Returns:
+            CompiledDFA: the matcher
+        """
+        with open(file_path, "rb") as f:
+            if not use_mmap:
+                return cls.from_buffer(f.read(), validate)
+            # the views of the tables keep the mapping alive after the file is closed
+            return cls.from_buffer(mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ), validate)
+
+    @classmethod
+    def from_dfa(cls, dfa):
+        """_summary_
+        This function is used to compile a DFA object, the states are renumbered to dense integers
+        in the order of dfa.states and every edge symbol becomes a column of the table
+        Args:
+            dfa (DFA): the DFA data object, either built over an AlphabetPartition or with symbols
+                that match disjoint sets of characters
+        Returns:
+            CompiledDFA: the compiled matcher
+        """
+        state_ids = {state: i for i, state in enumerate(dfa.states)}
+
+        if dfa.alphabet is not None:
+            # the symbols are the classes of the partition, use the class ids as the columns
+            columns = {label: i for i, label in enumerate(dfa.alphabet.labels)}
+        else:
+            # give every symbol of the DFA a column
+            columns = {}
+            for transition in dfa.transitions:
+                for symbol in edge_symbols(transition.characters):
+                    if symbol not in columns:
+                        columns[symbol] = len(columns)
+        num_columns = len(columns)
+
+        table = array("i", [DEAD_STATE]) * (len(state_ids) * num_columns)
+        for transition in dfa.transitions:
+            offset = state_ids[transition.from_] * num_columns
+            for symbol in edge_symbols(transition.characters):
+                table[offset + columns[symbol]] = state_ids[transition.to_]
+
+        accept = array("i", [NOT_ACCEPTING]) * len(state_ids)
+        for state in dfa.accept:
+            # single pattern DFAs accept token 0
+            token = dfa.accept_tokens[state] if dfa.accept_tokens is not None else 0
+            accept[state_ids[state]] = token
+
+        if dfa.alphabet is not None:
+            boundaries = dfa.alphabet.boundaries
+            boundary_columns = dfa.alphabet.boundary_columns
+        else:
+            boundaries, boundary_columns = cls.column_boundaries(
+                (first, last, column)
+                for symbol, column in columns.items()
+                for first, last in symbol_ranges(symbol)
+            )
+        return cls(table, num_columns, state_ids[dfa.start], accept, boundaries, boundary_columns)
+
+    @staticmethod
+    def column_boundaries(ranges):
+        """_summary_
+        This function is used to turn code point ranges of the columns into the sorted boundaries
+        used to find the column of a character with a binary search
+        Args:
+            ranges (iterable): (first, last, column) code point ranges, both ends included
+        Returns:
+            tuple: (boundaries, boundary_columns) lists
+        """
+        boundaries = []
+        boundary_columns = []
+        end = 0
+        for first, last, column in sorted(ranges):
+            if first < end:
+                raise ValueError(
+                    "The symbols of the DFA match overlapping characters, partition the alphabet first"
+                )
+            if first > end:
+                # gap of characters that no symbol matches
+                boundaries.append(end)
+                boundary_columns.append(DEAD_STATE)
+            boundaries.append(first)
+            boundary_columns.append(column)
+            end = last + 1
+        boundaries.append(end)
+        boundary_columns.append(DEAD_STATE)
+        return boundaries, boundary_columns
+
+    def start_state(self):
+        return self.start
+
+    def step(self, state, column):
+        return self.table[state * self.num_columns + column]
+
+    def token(self, state):
+        return self.accept[state]
+
+    def scan(self, state, text, pos, match=None):
+        # Matcher.scan with the table lookups inlined, the hot loop of every compiled match
+        table = self.table
+        num_columns = self.num_columns
+        columns = self._columns
+        accept = self.accept
+        for i in range(pos, len(text)):
+            char = text[i]
+            column = columns.get(char)
+            if column is None:
+                column = self.column(char)
+            if column < 0:
+                break
+            state = table[state * num_columns + column]
+            if state < 0:
+                break
+            token = accept[state]
+            if token != NOT_ACCEPTING:
+                match = (i + 1, token)
+        return match
@@ -0,0 +1,130 @@
+from regex_to_NFA import NFA, State, Edge
+from NFA_to_DFA import DFA_CLASS
+
+
+def remove_epsilons(nfa):
+    """_summary_
+    This function is used to build an equivalent NFA without epsilon transitions:
+    1. every state that the start or a symbol edge leads to is kept, and gets the symbol edges of all
+       the states of its epsilon closure (it accepts if its closure has an accepting state)
+    2. the states that are unreachable from the start or that cannot reach an accepting state are dropped
+    3. states with the same accepting tag and the same outgoing edges are merged, until no more merge
+    Args:
+        nfa (NFA): the NFA data object (Thompson, Glushkov, deserialized or lexer NFA)
+    Returns:
+        NFA: the new NFA with new states, with accept_tags when it has more than one accepting state
+    """
+    closures = DFA_CLASS()
+    # state -> {symbol -> list of targets} of the symbol edges
+    symbols = nfa.adjacency.symbols
+    accept_tags = nfa.accept_tags
+
+    def tag_of(closure):
+        # the rule with the highest priority (lowest index) among the accepting states of the
+        # closure, None when the closure has no accepting state
+        if accept_tags is None:
+            return 0 if nfa.accept in closure else None
+        tags = [accept_tags[state] for state in closure if state in accept_tags]
+        return min(tags) if tags else None
+
+    # 1. forward the symbol edges through the epsilon closures, only the start and the targets of
+    # symbol edges can still be reached once the epsilon edges are gone
+    # state -> {symbol -> targets (a dict used as an ordered set)}
+    edges = {}
+    tags = {}
+    to_visit = [nfa.start]
+    edges[nfa.start] = None
+    while to_visit:
+        state = to_visit.pop()
+        closure = closures.epsilon_closure(nfa, state)
+        tags[state] = tag_of(closure)
+        outgoing = {}
+        for member in closure:
+            member_outgoing = symbols.get(member)
+            if not member_outgoing:
+                # most of the states of a Thompson NFA only have epsilon transitions
+                continue
+            for symbol, targets in member_outgoing.items():
+                symbol_targets = outgoing.setdefault(symbol, {})
+                for target in targets:
+                    symbol_targets[target] = None
+                    if target not in edges:
+                        # found a new reachable state
+                        edges[target] = None
+                        to_visit.append(target)
+        edges[state] = outgoing
+
+    # 2. drop the states that cannot reach an accepting state (every state in edges is reachable)
+    reverse = {state: [] for state in edges}
+    for state, outgoing in edges.items():
+        for targets in outgoing.values():
+            for target in targets:
+                reverse[target].append(state)
+    alive = {state for state, tag in tags.items() if tag is not None}
+    to_visit = list(alive)
+    while to_visit:
+        state = to_visit.pop()
+        for source in reverse[state]:
+            if source not in alive:
+                alive.add(source)
+                to_visit.append(source)
+    # the start state is kept even when the NFA accepts nothing
+    alive.add(nfa.start)
+    live_edges = {}
+    for state, outgoing in edges.items():
+        if state not in alive:
+            continue
+        live_edges[state] = {}
+        for symbol, targets in outgoing.items():
+            targets = [target for target in targets if target in alive]
+            if targets:
+                live_edges[state][symbol] = targets
+
+    # 3. merge the states with the same tag and the same edges (to merged states) until nothing changes
+    representative = {state: state for state in live_edges}
+    while True:
+        groups = {}
+        for state, outgoing in live_edges.items():
+            signature = (
+                tags[state],
+                frozenset(
+                    (symbol, representative[target])
+                    for symbol, targets in outgoing.items()
+                    for target in targets
+                ),
+            )
+            groups.setdefault(signature, []).append(state)
+        if len(groups) == len(set(representative.values())):
+            break
+        for group in groups.values():
+            for state in group:
+                representative[state] = group[0]
+
+    # build the new NFA, the states are numbered in the order they were found from the start
+    new_states = {}
+    for state in live_edges:
+        kept = representative[state]
+        if kept not in new_states:
+            new_states[kept] = State(len(new_states))
+    transitions = []
+    for state, new_state in new_states.items():
+        seen = set()
+        for symbol, targets in live_edges[state].items():
+            for target in targets:
+                new_target = new_states[representative[target]]
+                if (symbol, new_target) not in seen:
+                    seen.add((symbol, new_target))
+                    transitions.append(Edge(new_state, new_target, symbol))
+
+    start = new_states[representative[nfa.start]]
+    new_tags = {
+        new_state: tags[state]
+        for state, new_state in new_states.items()
+        if tags[state] is not None
+    }
+    result = NFA(start, None, list(new_states.values()), transitions, alphabet=nfa.alphabet)
+    if accept_tags is not None or len(new_tags) != 1:
+        result.accept_tags = new_tags
+    else:
+        (result.accept,) = new_tags
+    return result
@@ -0,0 +1,104 @@
+from parser_classes import *
+from regex_to_NFA import NFA, State, Edge
+
+
+def glushkov_nfa(ast):
+    """_summary_
+    This function is used to build the position (Glushkov) automaton of an AST: every literal of the
+    regex is a position and gets one state, plus one start state. The nullable / first / last sets
+    of every node and the follow set of every position are computed in one post order walk with an
+    explicit stack, the NFA has no epsilon transitions and every edge into a position uses the
+    character of that position
+    Args:
+        ast (AstNode): the root of the AST built by the parser
+    Returns:
+        NFA: epsilon free NFA, with accept_tags when it has more than one accepting state
+    """
+    start = State(0)
+    states = [start]
+    # the character of every position, position i is states[i]
+    chars = [None]
+    # position -> set of the positions that can come right after it
+    follow = [None]
+
+    # Stack of the (nullable, first, last) of the visited sub trees
+    results = []
+    # Stack of (node, are the children of the node already visited)
+    to_visit = [(ast, False)]
+
+    while to_visit:
+        node, children_visited = to_visit.pop()
+
+        if isinstance(node, LiteralCharacterAstNode):
+            position = len(states)
+            states.append(State(position))
+            chars.append(node.char)
+            follow.append(set())
+            results.append((False, {position}, {position}))
+            continue
+
+        if not children_visited:
+            # Visit the node again after its children, the first child is visited first so the
+            # positions are numbered left to right
+            to_visit.append((node, True))
+            if isinstance(node, OrAstNode):
+                children = node.alternatives
+            elif isinstance(node, SeqAstNode):
+                children = node.items
+            else:
+                children = [node.left]
+            for child in reversed(children):
+                to_visit.append((child, False))
+            continue
+
+        if isinstance(node, OrAstNode):
+            count = len(node.alternatives)
+            parts = results[-count:]
+            del results[-count:]
+            nullable = False
+            first = set()
+            last = set()
+            for part_nullable, part_first, part_last in parts:
+                nullable = nullable or part_nullable
+                first |= part_first
+                last |= part_last
+            results.append((nullable, first, last))
+        elif isinstance(node, SeqAstNode):
+            count = len(node.items)
+            parts = results[-count:]
+            del results[-count:]
+            nullable = True
+            first = set()
+            last = set()
+            for part_nullable, part_first, part_last in parts:
+                # the positions that can end the sequence so far are followed by this item
+                for position in last:
+                    follow[position] |= part_first
+                if nullable:
+                    first |= part_first
+                last = last | part_last if part_nullable else part_last
+                nullable = nullable and part_nullable
+            results.append((nullable, first, last))
+        elif isinstance(node, StarAstNode) or isinstance(node, PlusAstNode):
+            nullable, first, last = results.pop()
+            # the end of an iteration can be followed by the start of the next one
+            for position in last:
+                follow[position] |= first
+            results.append((nullable or isinstance(node, StarAstNode), first, last))
+        elif isinstance(node, QuestionMarkAstNode):
+            _, first, last = results.pop()
+            results.append((True, first, last))
+
+    nullable, first, last = results.pop()
+
+    transitions = [Edge(start, states[position], chars[position]) for position in sorted(first)]
+    for position in range(1, len(states)):
+        for next_position in sorted(follow[position]):
+            transitions.append(Edge(states[position], states[next_position], chars[next_position]))
+
+    accepting = [states[position] for position in sorted(last)]
+    if nullable:
+        accepting.insert(0, start)
+    if len(accepting) == 1:
+        return NFA(start, accepting[0], states, transitions)
+    return NFA(start, None, states, transitions, accept_tags={state: 0 for state in accepting})
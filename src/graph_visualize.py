@@ -1,6 +1,3 @@
-import graphviz
-
-
 class GraphVisualize:
     def __init__(self):
         pass
@@ -18,25 +15,33 @@ class GraphVisualize:
             if json_data is None:
                 print("Error: No data to visualize")
                 return False
+            # imported here so that compiling never needs graphviz
+            import graphviz
+
             graph = graphviz.Digraph(engine="dot")
 
             for state, transitions in json_data.items():
                 if state == "startingState":
                     graph.edge("Start", transitions)
                     continue
+                if state == "alphabet":
+                    # code point ranges of the class labels of a DFA, not a state
+                    continue
 
                 if transitions.get("isTerminatingState", False):
                     graph.node(state, shape="doublecircle")
                 else:
                     graph.node(state, shape="circle")
 
-                for char, next_state in transitions.items():
-                    if char == "isTerminatingState":
+                for char, next_states in transitions.items():
+                    if char in ("isTerminatingState", "token"):
                         continue
-                    if "epsilon" in char:
-                        graph.edge(state, next_state, label="epsilon")
-                    else:
-                        graph.edge(state, next_state, label=char)
+                    label = "epsilon" if "epsilon" in char else char
+                    # several edges on the same character are stored as a list of states
+                    if isinstance(next_states, str):
+                        next_states = [next_states]
+                    for next_state in next_states:
+                        graph.edge(state, next_state, label=label)
 
             graph.render(name, format="png", cleanup=True)
             return True
@@ -0,0 +1,232 @@
+import json
+from regex_to_NFA import NFA, State, Edge
+from NFA_to_DFA import DFA, DfaState, DfaEdge
+from parser_classes import EPSILON
+from alphabet_partition import AlphabetPartition
+
+# Characters read from the file at a time in streaming mode
+STREAM_CHUNK_SIZE = 1 << 16
+
+
+class JsonDeserialize:
+    def __init__(self):
+        pass
+
+    def nfa_json_deserialize(self, json_data):
+        """_summary_
+        This function is used to build an NFA from the JSON format written by JsonSerialize in one
+        pass over the states, the state names are mapped to integer State objects as they are seen
+        Args:
+            json_data (dict | iterable): dictionary of the json data, or its (key, value) pairs
+        Returns:
+            NFA: the NFA data object (with accept_tags when it has several accepting states or
+                "token" rule indexes)
+        """
+        items = json_data.items() if isinstance(json_data, dict) else json_data
+        # state name -> State, a state can be a target before its own entry is seen
+        states = {}
+        # the states in the order of their entries, so a round trip keeps the state names
+        ordered = []
+        transitions = []
+        accepting = []
+        # accepting state -> rule index, written for lexer NFAs only
+        tokens = {}
+        start_name = None
+
+        def state_of(name):
+            state = states.get(name)
+            if state is None:
+                state = states[name] = State(len(states))
+            return state
+
+        for name, value in items:
+            if name == "startingState":
+                start_name = value
+                continue
+            state = state_of(name)
+            ordered.append(state)
+            for key, targets in value.items():
+                if key == "isTerminatingState":
+                    if targets:
+                        accepting.append(state)
+                    continue
+                if key == "token":
+                    tokens[state] = targets
+                    continue
+                symbol = EPSILON if key.startswith(EPSILON) else key
+                for target in self._targets(targets):
+                    transitions.append(Edge(state, state_of(target), symbol))
+
+        if start_name is None:
+            raise ValueError("The JSON data has no startingState")
+        start = state_of(start_name)
+        # states that are only targets go after the others
+        if len(ordered) < len(states):
+            listed = set(ordered)
+            ordered.extend(state for state in states.values() if state not in listed)
+        for i, state in enumerate(ordered):
+            state.id = i
+        nfa = NFA(start, None, ordered, transitions)
+        if len(accepting) == 1 and not tokens:
+            nfa.accept = accepting[0]
+        else:
+            # a missing token is the first rule
+            nfa.accept_tags = {state: tokens.get(state, 0) for state in accepting}
+        return nfa
+
+    def dfa_json_deserialize(self, json_data):
+        """_summary_
+        This function is used to build a DFA from the JSON format written by JsonSerialize in one
+        pass over the states, keeping the state names and numbering the states in order
+        Args:
+            json_data (dict | iterable): dictionary of the json data, or its (key, value) pairs
+        Returns:
+            DFA: the DFA data object (with the AlphabetPartition of its "alphabet" entry if it has one,
+                and the accept_tokens of a lexer DFA)
+        """
+        items = json_data.items() if isinstance(json_data, dict) else json_data
+        states = {}
+        transitions = []
+        accept = []
+        non_accept = []
+        # accepting state -> rule index, written for lexer DFAs only
+        tokens = {}
+        start_name = None
+        alphabet = None
+
+        def state_of(name):
+            state = states.get(name)
+            if state is None:
+                state = states[name] = DfaState(name=name, id=len(states))
+            return state
+
+        for name, value in items:
+            if name == "startingState":
+                start_name = value
+                continue
+            if name == "alphabet":
+                alphabet = AlphabetPartition.from_label_ranges(value)
+                continue
+            state = state_of(name)
+            (accept if value.get("isTerminatingState") else non_accept).append(state)
+            for key, targets in value.items():
+                if key == "isTerminatingState":
+                    continue
+                if key == "token":
+                    tokens[state] = targets
+                    continue
+                for target in self._targets(targets):
+                    transitions.append(DfaEdge(state, state_of(target), {key}))
+
+        if start_name is None:
+            raise ValueError("The JSON data has no startingState")
+        return DFA(
+            state_of(start_name),
+            accept,
+            non_accept,
+            list(states.values()),
+            transitions,
+            alphabet=alphabet,
+            # a missing token is the first rule
+            accept_tokens={state: tokens.get(state, 0) for state in accept} if tokens else None,
+        )
+
+    @staticmethod
+    def _targets(value):
+        # one target state name, or a list of them for several edges on the same character
+        return (value,) if isinstance(value, str) else value
+
+    def load_nfa(self, file_path, streaming=False):
+        """_summary_
+        Args:
+            file_path (str): path of the json file
+            streaming (bool, optional): decode the file one state at a time instead of loading
+                the whole document. Defaults to False.
+        Returns:
+            NFA: the NFA data object
+        """
+        with open(file_path, "r") as f:
+            return self.nfa_json_deserialize(self._read(f, streaming))
+
+    def load_dfa(self, file_path, streaming=False):
+        """_summary_
+        Args:
+            file_path (str): path of the json file
+            streaming (bool, optional): decode the file one state at a time instead of loading
+                the whole document. Defaults to False.
+        Returns:
+            DFA: the DFA data object
+        """
+        with open(file_path, "r") as f:
+            return self.dfa_json_deserialize(self._read(f, streaming))
+
+    def _read(self, f, streaming):
+        if streaming:
+            return self.iter_json_items(f)
+        return json.load(f)
+
+    @staticmethod
+    def iter_json_items(f, chunk_size=STREAM_CHUNK_SIZE):
+        """_summary_
+        This function is used to decode the top level object of a JSON file one member at a time,
+        so only the current state and a chunk of text are held in memory
+        Args:
+            f (file): text file object holding a JSON object
+            chunk_size (int, optional): characters read at a time. Defaults to 65536.
+        Yields:
+            tuple: the (key, value) pairs of the object in file order
+        """
+        decoder = json.JSONDecoder()
+        buffer = ""
+        pos = 0
+        eof = False
+
+        def skip_whitespace():
+            # returns the next non whitespace character, reading more of the file when needed
+            nonlocal buffer, pos, eof
+            while True:
+                while pos < len(buffer) and buffer[pos].isspace():
+                    pos += 1
+                if pos < len(buffer) or eof:
+                    return buffer[pos] if pos < len(buffer) else ""
+                buffer = f.read(chunk_size)
+                pos = 0
+                eof = not buffer
+
+        def decode():
+            # decodes the next value, the members are strings and objects so a value cut by the
+            # end of the buffer fails to decode instead of decoding to a shorter value
+            nonlocal buffer, pos, eof
+            while True:
+                try:
+                    value, end = decoder.raw_decode(buffer, pos)
+                    pos = end
+                    return value
+                except json.JSONDecodeError:
+                    if eof:
+                        raise
+                    more = f.read(chunk_size)
+                    eof = not more
+                    buffer = buffer[pos:] + more
+                    pos = 0
+
+        def expect(chars):
+            nonlocal pos
+            char = skip_whitespace()
+            if char not in chars or not char:
+                raise ValueError(f"Expected one of {chars!r} in the JSON file, found {char!r}")
+            pos += 1
+            return char
+
+        expect("{")
+        if skip_whitespace() == "}":
+            return
+        while True:
+            skip_whitespace()
+            key = decode()
+            expect(":")
+            skip_whitespace()
+            value = decode()
+            yield key, value
+            if expect(",}") == "}":
+                return
@@ -1,3 +1,7 @@
+import json
+from parser_classes import EPSILON
+
+
 class JsonSerialize:
     def __init__(self):
         pass
@@ -11,44 +15,34 @@ class JsonSerialize:
         Returns:
             dict: dictionary of the json data
         """
-        json_data = {}
-
-        address_to_name = {}
-        from_state = {}
-
-        for _, state in enumerate(nfa.states):
-            name = f"S{str(nfa.states.index(state))}"
-            address_to_name[state] = name
-            from_state[name] = []
-
-        for transition in nfa.transitions:
-            # Get all the states that the transition goes to
-            from_state[address_to_name[transition.from_]].append(
-                {"to": address_to_name[transition.to_], "char": transition.characters}
-            )
-
-        # Extracting starting state
-        json_data["startingState"] = address_to_name[nfa.start]
+        return dict(self.nfa_json_items(nfa))
 
-        for _, state in enumerate(from_state):
-            epsilons = 1
-            json_data[state] = {
-                "isTerminatingState": state == address_to_name[nfa.accept],
-            }
-
-            transitions = {}
-            for transition in from_state[state]:
-                if transition["char"] == "epsilon":
-                    transitions[f"epsilon{epsilons}"] = transition["to"]
-                    epsilons += 1
-                else:
-                    transitions[transition["char"]] = transition["to"]
+    def nfa_json_items(self, nfa):
+        """_summary_
+        This function is used to serialize the NFA one state at a time in a single pass over its
+        adjacency index, the states are named after their index in nfa.states
+        Args:
+            nfa (NFA): The NFA data object
 
-            # Check if transitions is empty
-            if len(transitions) > 0:
-                json_data[state].update(transitions)
+        Yields:
+            tuple: ("startingState", name) then the (name, transitions) of every state, with the
+                "token" (rule index) of the accepting states of a lexer NFA
+        """
+        names = {state: f"S{i}" for i, state in enumerate(nfa.states)}
+        accepting = nfa.accepting_states()
+        tokens = self._tokens(nfa.accept_tags)
+        adjacency = nfa.adjacency
 
-        return json_data
+        yield "startingState", names[nfa.start]
+        for state in nfa.states:
+            entry = {"isTerminatingState": state in accepting}
+            if tokens is not None and state in tokens:
+                entry["token"] = tokens[state]
+            for i, target in enumerate(adjacency.epsilon_targets(state), 1):
+                entry[f"{EPSILON}{i}"] = names[target]
+            for symbol, targets in adjacency.outgoing(state).items():
+                entry[symbol] = self._target_names(names, targets)
+            yield names[state], entry
 
     def dfa_json_serialize(self, dfa):
         """_summary_
@@ -58,19 +52,71 @@ class JsonSerialize:
         Returns:
             dict: dictionary of the json data
         """
-        json_data = {}
+        return dict(self.dfa_json_items(dfa))
+
+    def dfa_json_items(self, dfa):
+        """_summary_
+        This function is used to serialize the DFA one state at a time in a single pass over its
+        adjacency index
+        Args:
+            dfa (DFA): the DFA data object
+        Yields:
+            tuple: ("startingState", name), ("alphabet", code point ranges of every class label)
+                when the symbols are character classes, then the (name, transitions) of every state,
+                with the "token" (rule index) of the accepting states of a lexer DFA
+        """
+        names = {state: state.name for state in dfa.states}
+        accepting = set(dfa.accept)
+        tokens = self._tokens(dfa.accept_tokens)
+        adjacency = dfa.adjacency
+
         # set the starting state in the json data
-        json_data["startingState"] = dfa.start.name
+        yield "startingState", names[dfa.start]
+        if dfa.alphabet is not None:
+            # the class labels ("a-w,y-z", "a#3", ...) do not say which characters they match
+            yield "alphabet", dfa.alphabet.label_ranges()
+        for state in dfa.states:
+            entry = {"isTerminatingState": state in accepting}
+            if tokens is not None and state in tokens:
+                entry["token"] = tokens[state]
+            for symbol, targets in adjacency.outgoing(state).items():
+                entry[symbol] = self._target_names(names, targets)
+            yield names[state], entry
 
-        # loop over the states in the DFA
-        for _, state in enumerate(dfa.states):
-            # loop over the transitions in the state
-            json_data[state.name] = {
-                "isTerminatingState": state in dfa.accept,
-            }
-            for transition in dfa.transitions:
-                if transition.from_ == state:
-                    json_data[state.name][
-                        "".join(list(transition.characters))
-                    ] = transition.to_.name
-        return json_data
+    @staticmethod
+    def _tokens(accept_tokens):
+        # the rule index of every accepting state of a lexer automaton, written as "token" only when
+        # some state accepts another rule than the first one (a missing token is rule 0)
+        if accept_tokens is None or not any(accept_tokens.values()):
+            return None
+        return accept_tokens
+
+    @staticmethod
+    def _target_names(names, targets):
+        # a single target is stored as its name, edges on the same character to different states
+        # (nondeterminism) as a list so that none of them is dropped, duplicate edges only once
+        target_names = list(dict.fromkeys(names[target] for target in targets))
+        if len(target_names) == 1:
+            return target_names[0]
+        return target_names
+
+    @staticmethod
+    def write_json(items, f, indent=4):
+        """_summary_
+        This function is used to write the serialized states to a file as they are produced,
+        the output is the same as json.dump of the whole dictionary
+        Args:
+            items (iterable): the (key, value) pairs of the top level object
+            f (file): text file object to write to
+            indent (int, optional): indentation of the JSON. Defaults to 4.
+        """
+        padding = " " * indent
+        separator = "{\n"
+        for key, value in items:
+            f.write(separator)
+            f.write(padding)
+            f.write(json.dumps(key))
+            f.write(": ")
+            f.write(json.dumps(value, indent=indent).replace("\n", "\n" + padding))
+            separator = ",\n"
+        f.write("{}" if separator == "{\n" else "\n}")
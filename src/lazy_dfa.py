@@ -0,0 +1,184 @@
+from NFA_to_DFA import DFA_CLASS
+from alphabet_partition import AlphabetPartition
+from dfa_matcher import DEAD_STATE, NOT_ACCEPTING, Matcher
+from nfa_simulator import NfaSimulator
+
+# Transition of a cached state that was not determinized yet
+UNKNOWN_STATE = -2
+
+
+class LazyDFA(Matcher):
+    def __init__(self, nfa, max_states=10000, max_flushes=8):
+        """_summary_
+        DFA built on the fly from an NFA: a DFA state (set of NFA states) and its transitions are only
+        determinized when the input reaches them, and are kept in a cache of at most max_states states.
+        When the cache is full it is flushed, and when a single scan flushes it more than max_flushes
+        times the rest of the scan falls back to NFA simulation
+        Args:
+            nfa (NFA): the NFA data object (with or without an AlphabetPartition)
+            max_states (int, optional): the most DFA states kept in the cache. Defaults to 10000.
+            max_flushes (int, optional): cache flushes allowed in one scan before falling back to NFA simulation. Defaults to 8.
+        """
+        if max_states < 2:
+            raise ValueError("The lazy DFA needs room for at least 2 cached states")
+
+        if nfa.alphabet is None:
+            alphabet = AlphabetPartition.from_nfa(nfa)
+            nfa = alphabet.apply(nfa)
+        self._nfa = nfa
+        self._alphabet = nfa.alphabet
+        self._labels = self._alphabet.labels
+        # the columns of the matcher are the classes of the alphabet
+        self.boundaries = self._alphabet.boundaries
+        self.boundary_columns = self._alphabet.boundary_columns
+        self._closures = DFA_CLASS()
+        self.max_states = max_states
+        self.max_flushes = max_flushes
+        # bitset NFA simulator used when the cache thrashes, built on first use
+        self._simulator = None
+
+        self._start_subset = self._closures.epsilon_closure(nfa, nfa.start)
+        # character -> class id, filled the first time a character is seen
+        self._columns = {}
+        # number of times the cache was flushed since the LazyDFA was created
+        self.cache_flushes = 0
+        self._reset_cache()
+
+    @property
+    def num_cached_states(self):
+        return len(self._subsets)
+
+    def flush(self):
+        """
+        Drop all the cached DFA states and transitions
+        """
+        self._reset_cache()
+        self.cache_flushes += 1
+
+    def _reset_cache(self):
+        # frozenset of NFA states -> cached state id
+        self._state_ids = {}
+        # cached state id -> frozenset of NFA states
+        self._subsets = []
+        # cached state id -> token id (NOT_ACCEPTING if the state does not accept)
+        self._accept = []
+        # cached state id -> next state id of every class (UNKNOWN_STATE until determinized)
+        self._transitions = []
+
+    def _token(self, subset):
+        """_summary_
+        Args:
+            subset (frozenset): a set of NFA states
+        Returns:
+            int: the token accepted by the set of states (lowest rule index), NOT_ACCEPTING if none
+        """
+        nfa = self._nfa
+        if nfa.accept_tags is not None:
+            tags = [nfa.accept_tags[state] for state in subset if state in nfa.accept_tags]
+            return min(tags) if tags else NOT_ACCEPTING
+        return 0 if nfa.accept in subset else NOT_ACCEPTING
+
+    def _state_id(self, subset):
+        """_summary_
+        This function is used to get the cached state of a set of NFA states, adding it to the
+        cache (and flushing the cache first if it is full)
+        Args:
+            subset (frozenset): a set of NFA states
+        Returns:
+            int: the cached state id
+        """
+        state = self._state_ids.get(subset)
+        if state is not None:
+            return state
+        if len(self._subsets) >= self.max_states:
+            self.flush()
+        state = len(self._subsets)
+        self._state_ids[subset] = state
+        self._subsets.append(subset)
+        self._accept.append(self._token(subset))
+        self._transitions.append([UNKNOWN_STATE] * len(self._labels))
+        return state
+
+    def _move(self, subset, column):
+        """_summary_
+        Args:
+            subset (frozenset): a set of NFA states
+            column (int): the class id of the input character
+        Returns:
+            frozenset: the epsilon closure of the move of the states using the class (empty if none)
+        """
+        adjacency = self._nfa.adjacency
+        label = self._labels[column]
+        move = set()
+        for state in subset:
+            for target in adjacency.targets(state, label):
+                move |= self._closures.epsilon_closure(self._nfa, target)
+        return frozenset(move)
+
+    def step(self, state, column):
+        """_summary_
+        Args:
+            state (int): a cached state id
+            column (int): the class id of the input character
+        Returns:
+            int: the next cached state id, DEAD_STATE if there is none
+        """
+        row = self._transitions[state]
+        target = row[column]
+        if target == UNKNOWN_STATE:
+            subset = self._move(self._subsets[state], column)
+            flushes = self.cache_flushes
+            target = self._state_id(subset) if subset else DEAD_STATE
+            # after a flush the row of the current state is not in the cache anymore
+            if flushes == self.cache_flushes:
+                row[column] = target
+        return target
+
+    def start_state(self):
+        return self._state_id(self._start_subset)
+
+    def token(self, state):
+        return self._accept[state]
+
+    def scan(self, state, text, pos, match=None):
+        """_summary_
+        Matcher.scan that counts the cache flushes of the scan, when the cache thrashes the rest of
+        the scan runs by NFA simulation
+        Args:
+            state (int): the current cached state id
+            text (str): the input string
+            pos (int): the position of the next character
+            match (tuple, optional): the (end, token id) of the longest match so far. Defaults to None.
+        Returns:
+            tuple: (end, token id) of the longest match, None if there is no match
+        """
+        flushes = self.cache_flushes
+        for i in range(pos, len(text)):
+            column = self.column(text[i])
+            if column < 0:
+                break
+            state = self.step(state, column)
+            if state < 0:
+                break
+            token = self._accept[state]
+            if token != NOT_ACCEPTING:
+                match = (i + 1, token)
+            if self.cache_flushes - flushes > self.max_flushes:
+                # the cache is thrashing, finish the scan without caching
+                return self._simulate(self._subsets[state], text, i + 1, match)
+        return match
+
+    def _simulate(self, subset, text, pos, match):
+        """_summary_
+        This function is used to continue a scan by NFA simulation, from a set of NFA states
+        Args:
+            subset (frozenset): the current set of NFA states
+            text (str): the input string
+            pos (int): the position of the next character
+            match (tuple): the (end, token id) of the longest match so far, or None
+        Returns:
+            tuple: (end, token id) of the longest match, None if there is no match
+        """
+        if self._simulator is None:
+            self._simulator = NfaSimulator(self._nfa)
+        return self._simulator.scan(self._simulator.mask_of(subset), text, pos, match)
@@ -0,0 +1,95 @@
+from dataclasses import dataclass
+from regex_to_NFA import NFA_CLASS, NFA, State, Edge
+from parser_classes import EPSILON
+from pipeline import compile_nfa
+
+
+@dataclass
+class LexerToken:
+    name: str
+    lexeme: str
+    start: int
+    end: int
+
+
+class Lexer:
+    def __init__(self, rules, algorithm="hopcroft", construction="thompson"):
+        """_summary_
+        class that compiles an ordered list of token rules into one DFA and scans input with it
+        Args:
+            rules (list): ordered list of (token name, regex) pairs, when two rules match the same
+                longest lexeme the rule that comes first wins
+            algorithm (str, optional): the DFA minimization algorithm. Defaults to "hopcroft".
+            construction (str, optional): the NFA construction of the rules, "thompson" or
+                "glushkov". Defaults to "thompson".
+        """
+        if not rules:
+            raise ValueError("The lexer needs at least one rule")
+
+        self.token_names = [name for name, _ in rules]
+        self._nfa = self.build_nfa([regex for _, regex in rules], construction)
+
+        # determinize all the rules at once over one partition of the alphabet
+        result = compile_nfa(self._nfa, algorithm)
+        self._dfa = result.minimized
+        self.compiled = result.compiled
+
+    @staticmethod
+    def build_nfa(regexes, construction="thompson"):
+        """_summary_
+        This function is used to combine the NFAs of the rules into one NFA, a new start state goes
+        to the start of every rule using an epsilon transition and the accept state of every rule is
+        tagged with the index of the rule
+        Args:
+            regexes (list): the regex of every rule in priority order
+            construction (str, optional): the NFA construction of the rules. Defaults to "thompson".
+        Returns:
+            NFA: the combined NFA with its accept_tags
+        """
+        start = State(0)
+        states = [start]
+        transitions = []
+        accept_tags = {}
+        for index, regex in enumerate(regexes):
+            rule_nfa = NFA_CLASS(regex, export=False, construction=construction)._nfa
+            # renumber the states of the rule after the states of the previous rules
+            for state in rule_nfa.states:
+                state.id = len(states)
+                states.append(state)
+            transitions.extend(rule_nfa.transitions)
+            transitions.append(Edge(start, rule_nfa.start, EPSILON))
+            for state in rule_nfa.accepting_states():
+                accept_tags[state] = index
+        return NFA(start, None, states, transitions, accept_tags=accept_tags)
+
+    def match(self, text, pos=0):
+        """_summary_
+        This function is used to get the longest token that starts at the given position
+        Args:
+            text (str): the input string
+            pos (int, optional): where the token starts. Defaults to 0.
+        Returns:
+            LexerToken: the token, None if no rule matches a non empty lexeme at the position
+        """
+        match = self.compiled.longest_match(text, pos)
+        if match is None or match[0] == pos:
+            return None
+        end, token = match
+        return LexerToken(self.token_names[token], text[pos:end], pos, end)
+
+    def tokenize(self, text):
+        """_summary_
+        This function is used to split the whole input into tokens using the longest match
+        (maximal munch), ties are broken by the order of the rules
+        Args:
+            text (str): the input string
+        Yields:
+            LexerToken: the tokens of the input in order
+        """
+        pos = 0
+        while pos < len(text):
+            token = self.match(text, pos)
+            if token is None:
+                raise ValueError(f"No token matches the input at position {pos}")
+            yield token
+            pos = token.end
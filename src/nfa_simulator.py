@@ -0,0 +1,110 @@
+from NFA_to_DFA import DFA_CLASS
+from alphabet_partition import AlphabetPartition
+from dfa_matcher import NOT_ACCEPTING, Matcher
+
+
+class NfaSimulator(Matcher):
+    def __init__(self, nfa):
+        """_summary_
+        Thompson simulation of an NFA without determinization: the set of active states is an
+        integer bitset (bit i is the i-th state of nfa.states), and the epsilon closures are
+        precomputed so every input character is one table lookup per active state
+        Args:
+            nfa (NFA): the NFA data object (with or without an AlphabetPartition)
+        """
+        if nfa.alphabet is None:
+            alphabet = AlphabetPartition.from_nfa(nfa)
+            nfa = alphabet.apply(nfa)
+        self._nfa = nfa
+        self._alphabet = nfa.alphabet
+        # the columns of the matcher are the classes of the alphabet
+        self.boundaries = self._alphabet.boundaries
+        self.boundary_columns = self._alphabet.boundary_columns
+        # character -> class id, filled the first time a character is seen
+        self._columns = {}
+
+        closures = DFA_CLASS()
+        adjacency = nfa.adjacency
+        self.state_ids = {state: i for i, state in enumerate(nfa.states)}
+        column_of_label = {label: i for i, label in enumerate(self._alphabet.labels)}
+
+        # bitset of the epsilon closure of every state
+        closure_masks = []
+        for state in nfa.states:
+            mask = 0
+            for member in closures.epsilon_closure(nfa, state):
+                mask |= 1 << self.state_ids[member]
+            closure_masks.append(mask)
+
+        # state id -> {class id -> bitset of the closure of the targets}
+        self._steps = []
+        for state in nfa.states:
+            steps = {}
+            for label, targets in adjacency.outgoing(state).items():
+                column = column_of_label[label]
+                mask = steps.get(column, 0)
+                for target in targets:
+                    mask |= closure_masks[self.state_ids[target]]
+                steps[column] = mask
+            self._steps.append(steps)
+
+        self.start_mask = closure_masks[self.state_ids[nfa.start]]
+
+        # (token id, bitset of the accepting states of the token) in priority order
+        if nfa.accept_tags is not None:
+            token_masks = {}
+            for state, tag in nfa.accept_tags.items():
+                token_masks[tag] = token_masks.get(tag, 0) | 1 << self.state_ids[state]
+            self._token_masks = sorted(token_masks.items())
+        else:
+            self._token_masks = [(0, 1 << self.state_ids[nfa.accept])]
+        self.accept_mask = 0
+        for _, mask in self._token_masks:
+            self.accept_mask |= mask
+
+    # no active state left
+    dead_state = 0
+
+    def start_state(self):
+        return self.start_mask
+
+    def mask_of(self, states):
+        """_summary_
+        Args:
+            states (iterable): states of the NFA
+        Returns:
+            int: the bitset of the states
+        """
+        mask = 0
+        for state in states:
+            mask |= 1 << self.state_ids[state]
+        return mask
+
+    def step(self, active, column):
+        """_summary_
+        Args:
+            active (int): bitset of the active states
+            column (int): the class id of the input character
+        Returns:
+            int: bitset of the active states after the character (0 if none)
+        """
+        steps = self._steps
+        result = 0
+        while active:
+            low = active & -active
+            result |= steps[low.bit_length() - 1].get(column, 0)
+            active ^= low
+        return result
+
+    def token(self, active):
+        """_summary_
+        Args:
+            active (int): bitset of the active states
+        Returns:
+            int: the token accepted by the active states (lowest rule index), NOT_ACCEPTING if none
+        """
+        if active & self.accept_mask:
+            for token, mask in self._token_masks:
+                if active & mask:
+                    return token
+        return NOT_ACCEPTING
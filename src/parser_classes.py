@@ -16,175 +16,200 @@ class TokenType(Enum):
     LITERAL = auto()            # a-z A-Z 0-9
     DOT = auto()                # .
 
-@dataclass
+@dataclass(slots=True)
 class Token:
     token_type: TokenType
     string: str
 
+class RegexSyntaxError(Exception):
+    """
+    Error raised by the parser, position is the index of the token where the error was found
+    """
+    def __init__(self, message, position):
+        super().__init__(f"{message} at token {position}")
+        self.position = position
+
 class AstNode:
-    pass
+    __slots__ = ()
 
-@dataclass
+@dataclass(slots=True)
 class OrAstNode(AstNode):
-    left: AstNode
-    right: AstNode
+    alternatives: list  # of AstNode, at least 2
 
-@dataclass
+@dataclass(slots=True)
 class SeqAstNode(AstNode):
-    left: AstNode
-    right: AstNode
+    items: list  # of AstNode, at least 2
 
-@dataclass
+@dataclass(slots=True)
 class StarAstNode(AstNode):
     left: AstNode
 
-@dataclass
+@dataclass(slots=True)
 class PlusAstNode(AstNode):
     left: AstNode
 
-@dataclass
+@dataclass(slots=True)
 class QuestionMarkAstNode(AstNode):
     left: AstNode
 
-@dataclass
+@dataclass(slots=True)
 class LiteralCharacterAstNode(AstNode):
     char: str
 
 
-def parse_regex(tokens, current_token):
-    """
-    regex-expression -> or-expression
-    """
-    return parse_or(tokens, current_token)
+# Char of the literal built from DOT, it matches any character except the new line (like re).
+# It is not a single character (nor a range), so a literal '.' (escaped or in brackets) stays a
+# one character symbol
+ANY_CHARACTER = '<any>'
+MAX_CODE_POINT = 0x10FFFF
 
-def parse_or(tokens, current_token):
+def symbol_ranges(symbol):
     """
-    or-expression -> sequence-expression (OR sequence-expression)*
+    Code point ranges matched by the char of a LiteralCharacterAstNode, which is either
+    a single character, a range like 'a-z' or ANY_CHARACTER
+
+    Returns a list of (first, last) pairs, both ends included
     """
-    # Get the left sequence expression
-    left, current_token = parse_sequence(tokens, current_token)
-    
-    # Check if there are no more tokens
-    if current_token >= len(tokens):
-        return left, current_token
+    if symbol == ANY_CHARACTER:
+        return [(0, ord('\n') - 1), (ord('\n') + 1, MAX_CODE_POINT)]
     
-    # Final AST node
-    or_expression = left
+    if len(symbol) == 3 and symbol[1] == '-':
+        return [(ord(symbol[0]), ord(symbol[2]))]
     
-    # Loop through the rest of the tokens
-    while current_token < len(tokens) and tokens[current_token].token_type == TokenType.OR:
-        current_token += 1
-        
-        # Get the right sequence expression
-        right, current_token = parse_sequence(tokens, current_token)
-        
-        or_expression = OrAstNode(left=or_expression, right=right)
+    if len(symbol) != 1:
+        raise ValueError(f"Unknown symbol: {symbol}")
     
-    return or_expression, current_token
+    return [(ord(symbol), ord(symbol))]
 
-def parse_sequence(tokens, current_token):
+
+# Tokens of a quantifier and the AST node they build
+QUANTIFIERS = {
+    TokenType.STAR: StarAstNode,
+    TokenType.PLUS: PlusAstNode,
+    TokenType.QUESTION_MARK: QuestionMarkAstNode,
+}
+
+def parse_regex(tokens, current_token):
     """
-    sequence-expression -> quantified-expression (quantified-expression)*
+    regex-expression        -> or-expression
+    or-expression           -> sequence-expression (OR sequence-expression)*
+    sequence-expression     -> quantified-expression (quantified-expression)*
+    quantified-expression   -> base-expression ((STAR | PLUS | QUESTION_MARK) QUESTION_MARK?)?
+    base-expression         -> LITERAL
+                            | DOT
+                            | OPEN_PAREN regex-expression CLOSED_PAREN
+                            | OPEN_SQ_BRACKET sq-bracket-content CLOSED_SQ_BRACKET
+    
+    The parser does one pass over the tokens without recursion: every open parenthesis pushes a
+    group on an explicit stack, and the sequences and alternatives of a group are collected in
+    lists so the AST has n-ary SeqAstNode and OrAstNode nodes instead of chains of binary nodes
     """
-    # Get the left quantified expression
-    left, current_token = parse_quantified(tokens, current_token)
-    
-    # Check if there are no more tokens
-    if current_token >= len(tokens):
-        return left, current_token
-    
-    # Final AST node
-    sequence_expression = left
-    
-    # Loop through the rest of the tokens
-    while current_token < len(tokens) \
-        and tokens[current_token].token_type != TokenType.OR \
-        and tokens[current_token].token_type != TokenType.CLOSED_PAREN:
+    # Stack of the open groups, every group is (position of the open parenthesis, alternatives, items)
+    # where alternatives are the finished sequences of the group and items the current sequence
+    groups = []
+    alternatives = []
+    items = []
+    # Type of the previous token, a quantifier only applies to an expression
+    previous_type = None
+    # True after the '?' that makes the previous quantifier lazy
+    lazy = False
+    
+    while current_token < len(tokens):
+        token = tokens[current_token]
+        token_type = token.token_type
+        
+        if token_type == TokenType.LITERAL:
+            items.append(LiteralCharacterAstNode(char=token.string))
+        
+        elif token_type == TokenType.DOT:
+            # Dot match any character
+            items.append(LiteralCharacterAstNode(char=ANY_CHARACTER))
+        
+        elif token_type in QUANTIFIERS:
+            if previous_type in QUANTIFIERS:
+                if token_type == TokenType.QUESTION_MARK and not lazy:
+                    # Lazy quantifier (like re): it changes which match is found first, not
+                    # the strings that the regex accepts, so it builds nothing
+                    lazy = True
+                    current_token += 1
+                    continue
+                if token_type == TokenType.PLUS and not lazy:
+                    raise RegexSyntaxError("Possessive quantifiers are not supported", current_token)
+                raise RegexSyntaxError("Multiple repeat", current_token)
+            if not items:
+                raise RegexSyntaxError("Nothing to repeat", current_token)
+            items[-1] = QUANTIFIERS[token_type](left=items[-1])
+        
+        elif token_type == TokenType.OR:
+            alternatives.append(finish_sequence(items, current_token))
+            items = []
+        
+        elif token_type == TokenType.OPEN_PAREN:
+            groups.append((current_token, alternatives, items))
+            alternatives = []
+            items = []
+        
+        elif token_type == TokenType.CLOSED_PAREN:
+            if not groups:
+                # The closed parenthesis belongs to the caller
+                break
+            alternatives.append(finish_sequence(items, current_token))
+            expression = finish_alternatives(alternatives)
+            _, alternatives, items = groups.pop()
+            items.append(expression)
         
-        right, current_token = parse_quantified(tokens, current_token)
+        elif token_type == TokenType.OPEN_SQ_BRACKET:
+            sq_bracket, current_token = parse_sq_bracket_content(tokens, current_token + 1)
+            
+            if current_token >= len(tokens):
+                raise RegexSyntaxError("Expected square bracket", current_token)
+            
+            items.append(sq_bracket)
+        
+        else:
+            # DASH and CLOSED_SQ_BRACKET outside of square brackets are literal characters
+            items.append(LiteralCharacterAstNode(char=token.string))
         
-        sequence_expression = SeqAstNode(left=sequence_expression, right=right)
+        previous_type = token_type
+        lazy = False
+        current_token += 1
+    
+    if groups:
+        raise RegexSyntaxError("Expected closed parenthesis", groups[-1][0])
     
-    return sequence_expression, current_token
+    alternatives.append(finish_sequence(items, current_token))
+    return finish_alternatives(alternatives), current_token
 
-def parse_quantified(tokens, current_token):
+def finish_sequence(items, current_token):
     """
-    quantified-expression -> base-expression (STAR | PLUS | QUESTION_MARK)?
+    Build the node of a finished sequence-expression
     """
-    # Get the left base expression
-    left, current_token = parse_base(tokens, current_token)
+    if not items:
+        raise RegexSyntaxError("Expected an expression", current_token)
     
-    # Check if there are no more tokens
-    if current_token >= len(tokens):
-        return left, current_token
+    if len(items) == 1:
+        return items[0]
     
-    if tokens[current_token].token_type == TokenType.STAR:
-        current_token += 1
-        return StarAstNode(left=left), current_token
-    
-    if tokens[current_token].token_type == TokenType.PLUS:
-        current_token += 1
-        return PlusAstNode(left=left), current_token
-    
-    if tokens[current_token].token_type == TokenType.QUESTION_MARK:
-        current_token += 1
-        return QuestionMarkAstNode(left=left), current_token
-    
-    return left, current_token
+    return SeqAstNode(items=items)
 
-def parse_base(tokens, current_token):
+def finish_alternatives(alternatives):
     """
-    base-expression -> LITERAL
-                    | DOT
-                    | OPEN_PAREN regex-expression CLOSED_PAREN
-                    | OPEN_SQ_BRACKET sq-bracket-content CLOSED_SQ_BRACKET
+    Build the node of a finished or-expression
     """
-    # Check if there are no more tokens
-    if current_token >= len(tokens):
-        raise Exception("No more tokens to parse")
-    
-    token = tokens[current_token]
-    current_token += 1
-    
-    if token.token_type == TokenType.LITERAL:
-        return LiteralCharacterAstNode(char=token.string), current_token
-    
-    if token.token_type == TokenType.DOT:
-        # Epsilon because dot match any character
-        return LiteralCharacterAstNode(char='.'), current_token
+    if len(alternatives) == 1:
+        return alternatives[0]
     
-    if token.token_type == TokenType.OPEN_PAREN:
-        expression, current_token = parse_regex(tokens, current_token)
-        
-        if current_token >= len(tokens):
-            raise Exception("No more tokens to parse")
-        
-        if tokens[current_token].token_type != TokenType.CLOSED_PAREN:
-            raise Exception("Expected closed parenthesis")
-        
-        current_token += 1
-        return expression, current_token
-    
-    if token.token_type == TokenType.OPEN_SQ_BRACKET:
-        sq_bracket, current_token = parse_sq_bracket_content(tokens, current_token)
-        
-        if current_token >= len(tokens):
-            raise Exception("No more tokens to parse")
-        
-        if tokens[current_token].token_type != TokenType.CLOSED_SQ_BRACKET:
-            raise Exception("Expected square bracket")
-        
-        current_token += 1
-        return sq_bracket, current_token
+    return OrAstNode(alternatives=alternatives)
 
 def parse_sq_bracket_content(tokens, current_token):
     """
-    sq-bracket-content -> LITERAL
-                        | LITERAL DASH LITERAL
+    sq-bracket-content -> (LITERAL | LITERAL DASH LITERAL)+
+    
+    Returns the node of the content and the position of the CLOSED_SQ_BRACKET token
     """
     # Check if there are no more tokens
     if current_token >= len(tokens):
-        raise Exception("No more tokens to parse")
+        raise RegexSyntaxError("No more tokens to parse", current_token)
     
     chars = []
     is_dash_reached = False
@@ -195,8 +220,8 @@ def parse_sq_bracket_content(tokens, current_token):
         if tokens[current_token].token_type == TokenType.DASH:
             is_dash_reached = True
         elif is_dash_reached:
-            if len(chars) == 0:
-                raise Exception("Expected at least one character")
+            if len(chars) == 0 or isinstance(chars[-1], tuple):
+                raise RegexSyntaxError("Expected at least one character", current_token)
             
             range_start = chars.pop()
             range_end = tokens[current_token].string
@@ -208,20 +233,17 @@ def parse_sq_bracket_content(tokens, current_token):
         current_token += 1
     
     if is_dash_reached:
-        raise Exception("Wrong range format")
+        raise RegexSyntaxError("Wrong range format", current_token)
+    
+    if not chars:
+        raise RegexSyntaxError("Expected at least one character", current_token)
     
     # Handle the cases like [a-z b 0-5] should be like (a-z | b | 0-5)
-    expression = None
+    alternatives = []
     for char in chars:
         if isinstance(char, tuple):
-            if expression is None:
-                expression = LiteralCharacterAstNode(char=f"{char[0]}-{char[1]}")
-            else:
-                expression = OrAstNode(left=expression, right=LiteralCharacterAstNode(char=f"{char[0]}-{char[1]}"))
+            alternatives.append(LiteralCharacterAstNode(char=f"{char[0]}-{char[1]}"))
         else:
-            if expression is None:
-                expression = LiteralCharacterAstNode(char=char)
-            else:
-                expression = OrAstNode(left=expression, right=LiteralCharacterAstNode(char=char))
+            alternatives.append(LiteralCharacterAstNode(char=char))
     
-    return expression, current_token
\ No newline at end of file
+    return finish_alternatives(alternatives), current_token
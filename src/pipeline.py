@@ -0,0 +1,198 @@
+import os
+import time
+from dataclasses import dataclass, field
+from regex_to_NFA import NFA_CLASS, NFA
+from NFA_to_DFA import DFA_CLASS, DFA
+from alphabet_partition import AlphabetPartition
+from dfa_matcher import CompiledDFA
+from epsilon_elimination import remove_epsilons
+from json_serialize import JsonSerialize
+from graph_visualize import GraphVisualize
+
+
+@dataclass
+class CompileStats:
+    # stage name -> wall time in seconds, in the order the stages ran
+    stage_seconds: dict = field(default_factory=dict)
+    nfa_states: int = 0
+    nfa_edges: int = 0
+    epsilon_edges: int = 0
+    reduced_nfa_states: int = 0  # after remove_epsilons, when it runs
+    alphabet_classes: int = 0
+    dfa_states: int = 0  # before minimization
+    dfa_transitions: int = 0
+    minimized_states: int = 0
+    refinement_rounds: int = 0  # Moore rounds or Hopcroft splitters
+    state_closure_hits: int = 0
+    state_closure_misses: int = 0
+    set_closure_hits: int = 0
+    set_closure_misses: int = 0
+
+    @property
+    def total_seconds(self):
+        return sum(self.stage_seconds.values())
+
+    @property
+    def closure_hit_rate(self):
+        """
+        Fraction of the epsilon closure lookups (of states and of sets) answered by the caches
+        """
+        hits = self.state_closure_hits + self.set_closure_hits
+        lookups = hits + self.state_closure_misses + self.set_closure_misses
+        return hits / lookups if lookups else 0.0
+
+
+@dataclass
+class CompileResult:
+    nfa: NFA  # the Thompson or Glushkov NFA (over the characters of the regex)
+    dfa: DFA  # the subset construction DFA (over the classes of the alphabet)
+    minimized: DFA  # the minimized DFA
+    compiled: CompiledDFA  # the table matcher of the minimized DFA
+    alphabet: AlphabetPartition  # the classes of the alphabet used by the DFAs
+    stats: CompileStats = None  # timings and sizes of the compile
+
+    def to_json(self, directory="."):
+        """_summary_
+        This function is used to export the automata of the compile to nfa.json, dfa.json and
+        minimized_dfa.json in the given directory
+        Args:
+            directory (str, optional): the output directory. Defaults to ".".
+        Returns:
+            dict: automaton name -> path of its json file
+        """
+        json_serialize = JsonSerialize()
+        automata = {
+            "nfa": json_serialize.nfa_json_items(self.nfa),
+            "dfa": json_serialize.dfa_json_items(self.dfa),
+            "minimized_dfa": json_serialize.dfa_json_items(self.minimized),
+        }
+        paths = {}
+        for name, items in automata.items():
+            paths[name] = os.path.join(directory, f"{name}.json")
+            with open(paths[name], "w") as f:
+                json_serialize.write_json(items, f)
+        return paths
+
+    def visualize(self, directory="."):
+        """_summary_
+        This function is used to render the automata of the compile to png files with graphviz
+        Args:
+            directory (str, optional): the output directory. Defaults to ".".
+        Returns:
+            bool: True if all the automata were rendered
+        """
+        json_serialize = JsonSerialize()
+        graph_visualize = GraphVisualize()
+        automata = {
+            "nfa": json_serialize.nfa_json_serialize(self.nfa),
+            "dfa": json_serialize.dfa_json_serialize(self.dfa),
+            "minimized_dfa": json_serialize.dfa_json_serialize(self.minimized),
+        }
+        rendered = True
+        for name, json_data in automata.items():
+            rendered &= graph_visualize.graph_visualize(os.path.join(directory, name), json_data)
+        return rendered
+
+
+def compile_regex(
+    regex,
+    algorithm="hopcroft",
+    observer=None,
+    construction="thompson",
+    eliminate_epsilons=False,
+    **limits,
+):
+    """_summary_
+    This function is used to compile a regex to a minimized DFA without any file or stdout output,
+    use the exporters of the result to write or render the automata
+    Args:
+        regex (str): the regular expression
+        algorithm (str, optional): the DFA minimization algorithm. Defaults to "hopcroft".
+        observer (function, optional): called as observer(stage, seconds, stats) after every stage
+            of the compile. Defaults to None.
+        construction (str, optional): "thompson" or "glushkov" (epsilon free NFA). Defaults to "thompson".
+        eliminate_epsilons (bool, optional): run remove_epsilons on the NFA before the subset
+            construction. Defaults to False.
+        **limits: max_states, max_transitions and max_seconds of the subset construction
+    Returns:
+        CompileResult: the automata of every stage and the stats of the compile
+    Raises:
+        DeterminizationLimitError: when the DFA goes over one of the limits, LazyDFA or
+            NfaSimulator can match the pattern instead
+    """
+    nfa_class = NFA_CLASS(regex, export=False, construction=construction, defer_stages=True)
+    stats = CompileStats()
+
+    def on_stage(stage, seconds):
+        stats.stage_seconds[stage] = seconds
+        if observer is not None:
+            observer(stage, seconds, stats)
+
+    # the observer hears of every stage as it ends, so it can stop a compile that takes too long
+    nfa_class.build_nfa(on_stage)
+    return compile_nfa(
+        nfa_class._nfa, algorithm, observer, stats, eliminate_epsilons, **limits
+    )
+
+
+def compile_nfa(
+    nfa, algorithm="hopcroft", observer=None, stats=None, eliminate_epsilons=False, **limits
+):
+    """_summary_
+    This function is used to determinize and minimize an NFA over the classes of its alphabet
+    Args:
+        nfa (NFA): the NFA data object (with accept_tags for a lexer NFA)
+        algorithm (str, optional): the DFA minimization algorithm. Defaults to "hopcroft".
+        observer (function, optional): called as observer(stage, seconds, stats) after every stage
+            of the compile. Defaults to None.
+        stats (CompileStats, optional): the stats to add to. Defaults to new stats.
+        eliminate_epsilons (bool, optional): run remove_epsilons on the NFA before the subset
+            construction. Defaults to False.
+        **limits: max_states, max_transitions and max_seconds of the subset construction
+    Returns:
+        CompileResult: the automata of every stage and the stats of the compile
+    Raises:
+        DeterminizationLimitError: when the DFA goes over one of the limits
+    """
+    if stats is None:
+        stats = CompileStats()
+    stats.nfa_states = len(nfa.states)
+    stats.nfa_edges = len(nfa.transitions)
+    stats.epsilon_edges = sum(len(targets) for targets in nfa.adjacency.epsilon.values())
+
+    def run_stage(stage, function, *args, **kwargs):
+        start = time.perf_counter()
+        value = function(*args, **kwargs)
+        seconds = time.perf_counter() - start
+        stats.stage_seconds[stage] = seconds
+        if observer is not None:
+            observer(stage, seconds, stats)
+        return value
+
+    # the NFA that is determinized, result.nfa stays the NFA that was given
+    reduced_nfa = nfa
+    if eliminate_epsilons:
+        reduced_nfa = run_stage("remove_epsilons", remove_epsilons, nfa)
+        stats.reduced_nfa_states = len(reduced_nfa.states)
+
+    alphabet = run_stage("alphabet_partition", AlphabetPartition.from_nfa, reduced_nfa)
+    class_nfa = run_stage("apply_alphabet", alphabet.apply, reduced_nfa)
+    stats.alphabet_classes = len(alphabet.inputs)
+
+    dfa = DFA_CLASS(verbose=False)
+    run_stage(
+        "subset_construction", dfa.subset_construction, class_nfa, alphabet.inputs, **limits
+    )
+    stats.dfa_states = len(dfa._dfa.states)
+    stats.dfa_transitions = len(dfa._dfa.transitions)
+    stats.state_closure_hits = dfa.state_closure_hits
+    stats.state_closure_misses = dfa.state_closure_misses
+    stats.set_closure_hits = dfa.set_closure_hits
+    stats.set_closure_misses = dfa.set_closure_misses
+
+    minimized = run_stage("minimize_dfa", dfa.minimize_dfa, alphabet.inputs, algorithm)
+    stats.minimized_states = len(minimized.states)
+    stats.refinement_rounds = dfa.refinement_rounds
+
+    compiled = run_stage("compile_table", CompiledDFA.from_dfa, minimized)
+    return CompileResult(nfa, dfa._dfa, minimized, compiled, alphabet, stats)
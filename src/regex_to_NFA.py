@@ -1,46 +1,106 @@
 import re
+import time
 from parser_classes import *
 from graph_visualize import GraphVisualize
 from json_serialize import JsonSerialize
-import json
+from adjacency_index import IndexedAutomaton
 
 
 class State:
-    pass
+    """
+    State of an NFA, compared and hashed by identity. id is the index of the state in the
+    states list of its NFA, the name is only derived from it for display and serialization
+    """
 
+    __slots__ = ("id",)
 
-@dataclass
+    def __init__(self, id=None):
+        self.id = id
+
+    @property
+    def name(self):
+        return f"S{self.id}"
+
+    def __repr__(self):
+        return f"State({self.id})"
+
+
+@dataclass(slots=True, frozen=True)
 class Edge:
     from_: State
     to_: State
     characters: str  # of chars (literals, epsilon)
 
 @dataclass
-class NFA:
+class NFA(IndexedAutomaton):
     start: State
     accept: State
 
     # All states of the NFA including the start and accept
     states: list  # of State
     transitions: list  # of Edge
+    # AlphabetPartition when the symbols of the edges are character classes
+    alphabet: object = None
+    # accepting state -> rule index, for NFAs with several tagged accepting states (lexers)
+    accept_tags: dict = None
+
+    def accepting_states(self):
+        """
+        All the accepting states of the NFA
+        """
+        if self.accept_tags is not None:
+            return self.accept_tags.keys()
+        return {self.accept}
 
 
 class NFA_CLASS:
-    def __init__(self, regex):
+    def __init__(self, regex, export=True, construction="thompson", defer_stages=False):
+        """_summary_
+        class that contains the methods to convert a regex to NFA
+        regex: the regular expression
+        export: store the NFA in nfa.json and visualize it
+        construction: "thompson" for Thompson's construction (epsilon transitions) or "glushkov"
+            for the epsilon free position automaton
+        defer_stages: only check the regex, the caller builds the NFA with build_nfa() (export
+            is then ignored)
+        """
+        if construction not in ("thompson", "glushkov"):
+            raise ValueError(f"Unknown NFA construction: {construction}")
         if not self.check_regex(regex):
             raise ValueError(f"Invalid regular expression: {regex}")
 
         self._regex = regex
+        self._construction = construction
         self._tokens = []
         self._ast = None
         self._nfa = None
         self._nfa_json = None
 
-        self.tokenize()
-        self.parse()
-        self.AST_to_NFA()
-        self.nfa_to_json()
-        self.nfa_visualize()
+        # stage name -> wall time in seconds
+        self.stage_seconds = {}
+        if defer_stages:
+            return
+        self.build_nfa()
+        if export:
+            self.nfa_to_json()
+            self.nfa_visualize()
+
+    def build_nfa(self, on_stage=None):
+        """
+        Function used to run the stages tokenize, parse and AST_to_NFA, timing every stage
+        on_stage: called as on_stage(stage, seconds) as soon as each stage is done
+        """
+        try:
+            for stage in (self.tokenize, self.parse, self.AST_to_NFA):
+                start = time.perf_counter()
+                stage()
+                seconds = time.perf_counter() - start
+                self.stage_seconds[stage.__name__] = seconds
+                if on_stage is not None:
+                    on_stage(stage.__name__, seconds)
+        except RegexSyntaxError as error:
+            # only reached by regexes too deep for check_regex
+            raise ValueError(f"Invalid regular expression: {self._regex}") from error
 
     def check_regex(self, regex):
         """
@@ -48,9 +108,13 @@ class NFA_CLASS:
         """
         try:
             re.compile(regex)
-        except re.error:
-            print(f"Invalid regular expression: {regex}")
+        except (re.error, OverflowError):
+            # OverflowError for repetition counts that are too large
             return False
+        except RecursionError:
+            # too deeply nested for the recursive parser of re, the parser of this module does not
+            # recurse and raises RegexSyntaxError for an invalid regex
+            return True
         return True
 
     def tokenize(self):
@@ -96,173 +160,170 @@ class NFA_CLASS:
         regex-expression        -> or-expression
         or-expression           -> sequence-expression (OR sequence-expression)*
         sequence-expression     -> quantified-expression (quantified-expression)*
-        quantified-expression   -> base-expression (STAR | PLUS | QUESTION_MARK)?
+        quantified-expression   -> base-expression ((STAR | PLUS | QUESTION_MARK) QUESTION_MARK?)?
         base-expression         -> LITERAL
                                 | DOT
                                 | OPEN_PAREN regex-expression CLOSED_PAREN
                                 | OPEN_SQ_BRACKET sq-bracket-content CLOSED_SQ_BRACKET
-        sq-bracket-content      -> LITERAL
-                                | LITERAL DASH LITERAL
+        sq-bracket-content      -> (LITERAL | LITERAL DASH LITERAL)+
+
+        Raises RegexSyntaxError with the index of the token where the error was found
         """
-        expression, _ = parse_regex(self._tokens, 0)
+        expression, current_token = parse_regex(self._tokens, 0)
+        if current_token < len(self._tokens):
+            raise RegexSyntaxError("Unexpected closed parenthesis", current_token)
         self._ast = expression
 
     def construct_nfa(self, node):
-        if isinstance(node, OrAstNode):
-            return self.construct_or_nfa(node)
-        elif isinstance(node, SeqAstNode):
-            return self.construct_seq_nfa(node)
-        elif isinstance(node, StarAstNode) or isinstance(node, PlusAstNode):
-            return self.construct_star_plus_nfa(node)
-        elif isinstance(node, QuestionMarkAstNode):
-            return self.construct_question_mark_nfa(node)
-        elif isinstance(node, LiteralCharacterAstNode):
-            return self.construct_literal_class_nfa(node)
-
-    def construct_or_nfa(self, node):
-        # If we have regex A|B
-
-        # Get the NFAs representing A and B
-        left_nfa = self.construct_nfa(node.left)
-        right_nfa = self.construct_nfa(node.right)
+        """
+        Function used to build the NFA of an AST with Thompson's construction. The AST is walked in
+        post order with an explicit stack (no recursion), the construct_* functions append their
+        states and edges to one shared arena and return the (start, accept) fragment they built
+        """
+        # The arena of all the states and edges of the NFA
+        self._states = []
+        self._transitions = []
+
+        # Stack of the (start, accept) fragments of the visited sub trees
+        fragments = []
+        # Stack of (node, are the children of the node already built)
+        to_visit = [(node, False)]
+
+        while to_visit:
+            node, children_built = to_visit.pop()
+
+            if isinstance(node, LiteralCharacterAstNode):
+                fragments.append(self.construct_literal_class_nfa(node))
+                continue
+
+            if not children_built:
+                # Visit the node again after its children, the first child is built first
+                to_visit.append((node, True))
+                if isinstance(node, OrAstNode):
+                    children = node.alternatives
+                elif isinstance(node, SeqAstNode):
+                    children = node.items
+                else:
+                    children = [node.left]
+                for child in reversed(children):
+                    to_visit.append((child, False))
+                continue
+
+            if isinstance(node, OrAstNode):
+                count = len(node.alternatives)
+                parts = fragments[-count:]
+                del fragments[-count:]
+                fragments.append(self.construct_or_nfa(parts))
+            elif isinstance(node, SeqAstNode):
+                count = len(node.items)
+                parts = fragments[-count:]
+                del fragments[-count:]
+                fragments.append(self.construct_seq_nfa(parts))
+            elif isinstance(node, StarAstNode) or isinstance(node, PlusAstNode):
+                is_star = isinstance(node, StarAstNode)
+                fragments.append(self.construct_star_plus_nfa(fragments.pop(), is_star))
+            elif isinstance(node, QuestionMarkAstNode):
+                fragments.append(self.construct_question_mark_nfa(fragments.pop()))
+
+        start, accept = fragments.pop()
+        return NFA(start, accept, self._states, self._transitions)
+
+    def new_state(self):
+        # Create a new state in the arena
+        state = State(len(self._states))
+        self._states.append(state)
+        return state
+
+    def new_edge(self, from_, to_, characters):
+        # Create a new edge in the arena
+        self._transitions.append(Edge(from_=from_, to_=to_, characters=characters))
+
+    def construct_or_nfa(self, parts):
+        # If we have regex A|B|..., parts are the (start, accept) of the NFAs of the alternatives
 
         # Create 2 new states, start and accept for the full NFA
-        start = State()
-        accept = State()
-
-        # Link the start state with both the start of A's NFA and B's NFA with an epsilon transitions
-        start_transition_1 = Edge(from_=start, to_=left_nfa.start, characters=EPSILON)
-        start_transition_2 = Edge(
-            from_=start, to_=right_nfa.start, characters=EPSILON
-        )
-
-        # Link the accept state with both the accept of A's NFA and B's NFA with an epsilon transitions
-        final_transition_1 = Edge(
-            from_=left_nfa.accept, to_=accept, characters=EPSILON
-        )
-        final_transition_2 = Edge(
-            from_=right_nfa.accept, to_=accept, characters=EPSILON
-        )
-
-        # Finalize the Or NFA and return it
-        states = [*left_nfa.states, *right_nfa.states, start, accept]
-        transitions = [
-            *left_nfa.transitions,
-            *right_nfa.transitions,
-            start_transition_1,
-            start_transition_2,
-            final_transition_1,
-            final_transition_2,
-        ]
-        return NFA(start, accept, states, transitions)
-
-    def construct_seq_nfa(self, node):
-        # If we have regex AB
-
-        # Get the NFAs representing A and B
-        left_nfa = self.construct_nfa(node.left)
-        right_nfa = self.construct_nfa(node.right)
-
-        # Link the two NFAs by connecting the accept state of A to the start state of B
-        final_transition = Edge(
-            from_=left_nfa.accept, to_=right_nfa.start, characters=EPSILON
-        )
-
-        # Finalize the Seq NFA and return it
-        states = [*left_nfa.states, *right_nfa.states]
-        transitions = [*left_nfa.transitions, *right_nfa.transitions, final_transition]
-        return NFA(left_nfa.start, right_nfa.accept, states, transitions)
-
-    def construct_star_plus_nfa(self, node):
-        # If we have regex A* or A+
-        is_star = isinstance(node, StarAstNode)
-
-        # Get the NFA representing A
-        left_nfa = self.construct_nfa(node.left)
+        start = self.new_state()
+        accept = self.new_state()
+
+        # Link the start state with the start of every alternative's NFA with an epsilon transitions
+        for part in parts:
+            self.new_edge(start, part[0], EPSILON)
+
+        # Link the accept state with the accept of every alternative's NFA with an epsilon transitions
+        for part in parts:
+            self.new_edge(part[1], accept, EPSILON)
+
+        return start, accept
+
+    def construct_seq_nfa(self, parts):
+        # If we have regex AB..., parts are the (start, accept) of the NFAs of the items in order
+
+        # Link the NFAs by connecting the accept state of every item to the start state of the next one
+        for left, right in zip(parts, parts[1:]):
+            self.new_edge(left[1], right[0], EPSILON)
+
+        return parts[0][0], parts[-1][1]
+
+    def construct_star_plus_nfa(self, left, is_star):
+        # If we have regex A* or A+, left is the (start, accept) of A's NFA
 
         # Create 2 new states, start and accept for the full NFA
-        start = State()
-        accept = State()
+        start = self.new_state()
+        accept = self.new_state()
 
         # Link the new start to the start of A's NFA
-        start_transition_1 = Edge(from_=start, to_=left_nfa.start, characters=EPSILON)
-
-        # For star nodes only, it also goes to the accept state directly to represent accepting an empty inputs
-        start_transition_2 = Edge(from_=start, to_=accept, characters=EPSILON)
+        self.new_edge(start, left[0], EPSILON)
 
         # Link the accept state with the accept of A's NFA
-        final_transition_1 = Edge(
-            from_=left_nfa.accept, to_=accept, characters=EPSILON
-        )
+        self.new_edge(left[1], accept, EPSILON)
 
         # To represent zero|one 'or more' we link the accept state of A with the new start state
-        final_transition_2 = Edge(
-            from_=left_nfa.accept, to_=start, characters=EPSILON
-        )
-
-        # Finalize the star or plus NFA and return it
-        states = [*left_nfa.states, start, accept]
-        transitions = [
-            *left_nfa.transitions,
-            start_transition_1,
-            final_transition_1,
-            final_transition_2,
-        ]
-        if is_star:
-            transitions.append(start_transition_2)
+        self.new_edge(left[1], start, EPSILON)
 
-        return NFA(start, accept, states, transitions)
+        # For star nodes only, it also goes to the accept state directly to represent accepting an empty inputs
+        if is_star:
+            self.new_edge(start, accept, EPSILON)
 
-    def construct_question_mark_nfa(self, node):
-        # If we have regex A?
+        return start, accept
 
-        # Get the NFA representing A
-        left_nfa = self.construct_nfa(node.left)
+    def construct_question_mark_nfa(self, left):
+        # If we have regex A?, left is the (start, accept) of A's NFA
 
         # Create 2 new states, start and accept for the full NFA
-        start = State()
-        accept = State()
+        start = self.new_state()
+        accept = self.new_state()
 
         # Link the new start to the start of A's NFA
-        start_transition_1 = Edge(from_=start, to_=left_nfa.start, characters=EPSILON)
+        self.new_edge(start, left[0], EPSILON)
 
         # It also goes to the accept state directly to represent accepting an empty inputs
-        start_transition_2 = Edge(from_=start, to_=accept, characters=EPSILON)
+        self.new_edge(start, accept, EPSILON)
 
         # Link the accept state with the accept of A's NFA
-        final_transition_1 = Edge(
-            from_=left_nfa.accept, to_=accept, characters=EPSILON
-        )
+        self.new_edge(left[1], accept, EPSILON)
 
-        # Finalize the question mark NFA and return it
-        states = [*left_nfa.states, start, accept]
-        transitions = [
-            *left_nfa.transitions,
-            start_transition_1,
-            start_transition_2,
-            final_transition_1,
-        ]
-
-        return NFA(start, accept, states, transitions)
+        return start, accept
 
     def construct_literal_class_nfa(self, node):
         # If we have regex 'x' for any character x
 
         # Create 2 new states, start and accept for the full NFA
-        start = State()
-        accept = State()
+        start = self.new_state()
+        accept = self.new_state()
 
         # Single transition that goes from the starting to the accepting on the relevant characters
-        final_transition = Edge(start, accept, node.char)
-
-        # Finalize the literal and character class NFA and return it
-        states = [start, accept]
-        transitions = [final_transition]
+        self.new_edge(start, accept, node.char)
 
-        return NFA(start, accept, states, transitions)
+        return start, accept
 
     def AST_to_NFA(self):
-        self._nfa = self.construct_nfa(self._ast)
+        if self._construction == "glushkov":
+            # imported here because glushkov uses the NFA classes of this module
+            from glushkov import glushkov_nfa
+
+            self._nfa = glushkov_nfa(self._ast)
+        else:
+            self._nfa = self.construct_nfa(self._ast)
 
     def nfa_to_json(self):
         """
@@ -270,11 +331,11 @@ class NFA_CLASS:
         """
         json_serialize = JsonSerialize()
         self._nfa_json = json_serialize.nfa_json_serialize(self._nfa)
-        del json_serialize
-        
+
         # Store the nfa json in a file
         with open("nfa.json", "w") as f:
-            json.dump(self._nfa_json, f, indent=4)
+            json_serialize.write_json(self._nfa_json.items(), f)
+        del json_serialize
 
     def nfa_visualize(self, path="nfa"):
         graph_visualize = GraphVisualize()
@@ -0,0 +1,198 @@
+from dataclasses import dataclass
+from dfa_matcher import NOT_ACCEPTING
+
+# Bytes read from a file object at a time
+DEFAULT_CHUNK_SIZE = 1 << 16
+# Encodings of the input, a character is one byte in latin-1 and one to four bytes in utf-8
+ENCODINGS = ("utf-8", "latin-1")
+
+
+def utf8_length(byte):
+    """
+    Number of bytes of the UTF-8 sequence that starts with the given byte (1 for a byte that
+    cannot start a sequence, it then fails to decode)
+    """
+    if 0xC2 <= byte <= 0xDF:
+        return 2
+    if 0xE0 <= byte <= 0xEF:
+        return 3
+    if 0xF0 <= byte <= 0xF4:
+        return 4
+    return 1
+
+
+@dataclass
+class StreamMatch:
+    name: object  # the token name (the token id when the scanner has no token names)
+    start: int  # byte offset of the first byte of the match
+    end: int  # byte offset after the last byte of the match
+
+
+class StreamScanner:
+    def __init__(self, compiled, token_names=None, skip_unmatched=True, encoding="utf-8"):
+        """_summary_
+        Scanner that runs a CompiledDFA over a stream of bytes (file object, iterable of chunks,
+        mmap or any other buffer) in bounded memory, carrying the DFA state across chunk boundaries.
+        The characters are decoded as they are fed to the DFA (a UTF-8 sequence can be split
+        between two chunks), the offsets of the matches are byte offsets.
+        Args:
+            compiled (CompiledDFA): the compiled DFA (of a single pattern or of a Lexer)
+            token_names (list, optional): the name of every token id. Defaults to None.
+            skip_unmatched (bool, optional): skip the bytes that start no match (like re.finditer)
+                instead of raising ValueError (like a lexer). Defaults to True.
+            encoding (str, optional): "utf-8" or "latin-1" (every byte is the character with the
+                same code point). Invalid UTF-8 bytes match nothing. Defaults to "utf-8".
+        """
+        if encoding not in ENCODINGS:
+            raise ValueError(f"Unsupported encoding: {encoding}")
+        self.compiled = compiled
+        self.token_names = token_names
+        self.skip_unmatched = skip_unmatched
+        self.utf8 = encoding == "utf-8"
+        # byte value -> column of the table (ASCII only in utf-8)
+        self._byte_columns = [compiled.column(chr(byte)) for byte in range(256)]
+
+    @classmethod
+    def from_lexer(cls, lexer, skip_unmatched=False, encoding="utf-8"):
+        """_summary_
+        Args:
+            lexer (Lexer): the lexer whose compiled DFA and token names are used
+            skip_unmatched (bool, optional): skip the bytes that start no token. Defaults to False.
+            encoding (str, optional): "utf-8" or "latin-1". Defaults to "utf-8".
+        Returns:
+            StreamScanner: the scanner
+        """
+        return cls(lexer.compiled, lexer.token_names, skip_unmatched, encoding)
+
+    def scan(self, source, chunk_size=DEFAULT_CHUNK_SIZE):
+        """_summary_
+        This function is used to lazily find the longest non empty matches of the input, left to right
+        Args:
+            source: a binary file object, a buffer (bytes, bytearray, memoryview, mmap.mmap) that is
+                scanned in place without copying, or an iterable of bytes chunks
+            chunk_size (int, optional): bytes read at a time from a file object. Defaults to 65536.
+        Yields:
+            StreamMatch: the matches with their byte offsets
+        """
+        if hasattr(source, "read"):
+            chunks = iter(lambda: source.read(chunk_size), b"")
+        else:
+            try:
+                chunks = (memoryview(source),)
+            except TypeError:
+                chunks = source
+
+        # carried between chunks: the start of the current match attempt, the position of the
+        # next byte to feed, the DFA state and the longest match (end, token) of the attempt
+        carry = (0, 0, self.compiled.start, None)
+        # bytes from the start of the current attempt that belong to the previous chunks
+        pending = bytearray()
+        base = 0
+        for chunk in chunks:
+            if isinstance(chunk, str):
+                raise TypeError("The stream chunks must be bytes")
+            chunk = memoryview(chunk)
+            carry = yield from self._run(pending, base, chunk, carry, final=False)
+            # keep only the bytes of the current attempt
+            start = carry[0]
+            chunk_base = base + len(pending)
+            if start < chunk_base:
+                del pending[: start - base]
+                pending += chunk
+            else:
+                pending = bytearray(chunk[start - chunk_base :])
+            base = start
+        yield from self._run(pending, base, memoryview(b""), carry, final=True)
+
+    def _run(self, pending, base, chunk, carry, final):
+        """_summary_
+        This function is used to feed the bytes of a chunk to the DFA, resolving the matches whose
+        attempt ended and backtracking to the end of the longest match like a lexer
+        Args:
+            pending (bytearray): bytes of the current attempt from the previous chunks, starting at base
+            base (int): byte offset of pending[0]
+            chunk (memoryview): the new bytes, starting right after pending
+            carry (tuple): (start, pos, state, match) of the current attempt
+            final (bool): True when there is no more input
+        Yields:
+            StreamMatch: the resolved matches
+        Returns:
+            tuple: the (start, pos, state, match) to carry to the next chunk
+        """
+        compiled = self.compiled
+        table = compiled.table
+        num_columns = compiled.num_columns
+        accept = compiled.accept
+        start_state = compiled.start
+        byte_columns = self._byte_columns
+        utf8 = self.utf8
+        names = self.token_names
+
+        chunk_base = base + len(pending)
+        end = chunk_base + len(chunk)
+        start, pos, state, match = carry
+        while True:
+            if pos < end:
+                byte = chunk[pos - chunk_base] if pos >= chunk_base else pending[pos - base]
+                length = 1
+                if byte < 0x80 or not utf8:
+                    column = byte_columns[byte]
+                else:
+                    length = utf8_length(byte)
+                    if pos + length > end and not final:
+                        # the rest of the character is in the next chunk
+                        break
+                    column = self._utf8_column(pending, base, chunk, pos, length)
+                next_state = table[state * num_columns + column] if column >= 0 else -1
+                if next_state >= 0:
+                    state = next_state
+                    pos += length
+                    token = accept[state]
+                    if token != NOT_ACCEPTING:
+                        match = (pos, token)
+                    continue
+            elif not final or start >= end:
+                break
+
+            # the attempt that started at start is over
+            if match is not None:
+                match_end, token = match
+                yield StreamMatch(names[token] if names else token, start, match_end)
+                start = match_end
+            elif self.skip_unmatched:
+                start += 1
+            else:
+                raise ValueError(f"No token matches the input at offset {start}")
+            pos = start
+            state = start_state
+            match = None
+
+        return start, pos, state, match
+
+    def _utf8_column(self, pending, base, chunk, pos, length):
+        """_summary_
+        Args:
+            pending (bytearray): bytes of the current attempt from the previous chunks, starting at base
+            base (int): byte offset of pending[0]
+            chunk (memoryview): the bytes right after pending
+            pos (int): byte offset of the first byte of the character
+            length (int): number of bytes of the character
+        Returns:
+            int: the column of the character, -1 if the bytes are not valid UTF-8
+        """
+        chunk_base = base + len(pending)
+        if pos >= chunk_base:
+            data = bytes(chunk[pos - chunk_base : pos - chunk_base + length])
+        else:
+            # the character is in the previous chunks, or split between them and this one
+            data = bytes(pending[pos - base : pos - base + length]) + bytes(
+                chunk[: max(0, pos + length - chunk_base)]
+            )
+        try:
+            char = data.decode("utf-8")
+        except UnicodeDecodeError:
+            return -1
+        if len(char) != 1:
+            # cut by the end of the input
+            return -1
+        return self.compiled.column(char)
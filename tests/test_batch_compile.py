@@ -0,0 +1,52 @@
+import os
+import pickle
+from batch_compile import batch_compile
+from compile_cache import CompileCache
+from dfa_matcher import CompiledDFA
+from NFA_to_DFA import DeterminizationLimitError
+
+REGEXES = ["(a|b)*abb", "[a-z]+x", "a.b"]
+OPTIONS = {"construction": "glushkov", "eliminate_epsilons": True, "algorithm": "moore"}
+
+
+def test_build_options_are_forwarded():
+    results = batch_compile(REGEXES, max_workers=2, **OPTIONS)
+    assert all(result.ok for result in results)
+    assert results[0].compiled.fullmatch("babb")
+    assert not results[0].compiled.fullmatch("ab")
+
+
+def test_build_options_are_part_of_the_cache_key(tmp_path):
+    default = batch_compile(REGEXES, max_workers=2, cache_dir=tmp_path)
+    glushkov = batch_compile(REGEXES, max_workers=2, cache_dir=tmp_path, **OPTIONS)
+    for regex, default_result, result in zip(REGEXES, default, glushkov):
+        assert result.path == CompileCache(tmp_path).path(CompileCache.key_for(regex, **OPTIONS))
+        assert result.path != default_result.path
+        assert os.path.exists(result.path)
+    assert CompiledDFA.load(glushkov[2].path).fullmatch("axb")
+
+
+def test_limits_are_not_part_of_the_cache_key(tmp_path):
+    limited = batch_compile(REGEXES, max_workers=2, cache_dir=tmp_path, max_states=100)
+    unlimited = batch_compile(REGEXES, max_workers=2, cache_dir=tmp_path)
+    assert [result.path for result in limited] == [result.path for result in unlimited]
+
+    cache = CompileCache(tmp_path)
+    cache.get(REGEXES[0], max_states=50, max_seconds=10)
+    cache.get(REGEXES[0], max_transitions=1000)
+    cache.get(REGEXES[0])
+    assert (cache.disk_hits, cache.hits, cache.misses) == (1, 2, 0)
+
+
+def test_limit_errors_keep_their_fields():
+    error = DeterminizationLimitError("max_states", 10, 25, 0.5)
+    copy = pickle.loads(pickle.dumps(error))
+    assert (copy.limit, copy.states, copy.transitions, copy.seconds) == ("max_states", 10, 25, 0.5)
+    assert str(copy) == str(error)
+
+    blowup, small = batch_compile(["(a|b)*a(a|b)(a|b)(a|b)(a|b)", "ab"], max_workers=2, max_states=8)
+    assert not blowup.ok and small.ok
+    assert blowup.limit_error.limit == "max_states"
+    assert blowup.limit_error.states >= 8
+    assert blowup.error.startswith("DeterminizationLimitError: Subset construction stopped by")
+    assert small.limit_error is None
@@ -0,0 +1,23 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "benchmarks"))
+
+from run_benchmarks import compare  # noqa: E402
+
+
+def result(stage, seconds):
+    return {"family": "blowup", "size": 4, "stage": stage, "seconds": seconds}
+
+
+def test_compare_ignores_timer_noise():
+    baseline = [result("tokenize", 0.000023), result("subset_construction", 0.010)]
+    results = [result("tokenize", 0.000029), result("subset_construction", 0.011)]
+    assert compare(results, baseline, 1.25) == 0
+
+
+def test_compare_reports_slower_stages():
+    baseline = [result("tokenize", 0.000023), result("subset_construction", 0.010)]
+    results = [result("tokenize", 0.002), result("subset_construction", 0.020)]
+    assert compare(results, baseline, 1.25) == 2
+    assert compare(results, baseline, 1.25, min_seconds=0.05) == 0
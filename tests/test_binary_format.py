@@ -0,0 +1,70 @@
+import os
+import struct
+import sys
+from array import array
+import pytest
+from compile_cache import CompileCache
+from dfa_matcher import CompiledDFA, BINARY_HEADER
+from pipeline import compile_regex
+
+INPUTS = ["", "abb", "babb", "ab", "aabbabb", "abc", "x"]
+
+
+def other_byte_order(data):
+    """
+    The same compiled DFA as written by a machine with the other byte order
+    """
+    fields = list(BINARY_HEADER.unpack_from(data))
+    fields[2] = sys.byteorder != "big"
+    values = array("i")
+    values.frombytes(data[BINARY_HEADER.size :])
+    values.byteswap()
+    return BINARY_HEADER.pack(*fields) + values.tobytes()
+
+
+def test_round_trip(tmp_path):
+    compiled = compile_regex("(a|b)*abb").compiled
+    path = tmp_path / "dfa.bin"
+    compiled.save(path)
+    for loaded in (CompiledDFA.load(path), CompiledDFA.load(path, use_mmap=False)):
+        assert loaded.num_states == compiled.num_states
+        for text in INPUTS:
+            assert loaded.fullmatch(text) == compiled.fullmatch(text)
+
+
+def test_other_byte_order():
+    compiled = compile_regex("(a|b)*abb").compiled
+    loaded = CompiledDFA.from_buffer(other_byte_order(compiled.to_bytes()))
+    assert list(loaded.table) == list(compiled.table)
+    assert list(loaded.accept) == list(compiled.accept)
+    for text in INPUTS:
+        assert loaded.fullmatch(text) == compiled.fullmatch(text)
+
+
+def test_rejects_states_out_of_range():
+    compiled = compile_regex("ab").compiled
+    data = bytearray(compiled.to_bytes())
+    # the first entry of the transition table goes to a state that does not exist
+    struct.pack_into("=i", data, BINARY_HEADER.size, compiled.num_states)
+    CompiledDFA.from_buffer(bytes(data))
+    with pytest.raises(ValueError):
+        CompiledDFA.from_buffer(bytes(data), validate=True)
+
+    fields = list(BINARY_HEADER.unpack_from(compiled.to_bytes()))
+    fields[5] = compiled.num_states
+    data = BINARY_HEADER.pack(*fields) + compiled.to_bytes()[BINARY_HEADER.size :]
+    with pytest.raises(ValueError):
+        CompiledDFA.from_buffer(data)
+
+
+@pytest.mark.skipif(not os.path.isdir("/proc/self/fd"), reason="needs /proc/self/fd")
+def test_cache_does_not_keep_files_open(tmp_path):
+    regexes = [f"(a|b)*a{'b' * i}" for i in range(20)]
+    for regex in regexes:
+        CompileCache(tmp_path).get(regex)
+    cache = CompileCache(tmp_path)
+    before = len(os.listdir("/proc/self/fd"))
+    compiled = [cache.get(regex) for regex in regexes]
+    assert cache.disk_hits == len(regexes)
+    assert len(os.listdir("/proc/self/fd")) == before
+    assert compiled[3].fullmatch("abbb")
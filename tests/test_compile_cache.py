@@ -0,0 +1,53 @@
+import os
+from compile_cache import CompileCache
+
+REGEXES = ["(a|b)*abb", "[a-z]+x", "a.b", "(ab)*c"]
+
+
+def test_memory_hits():
+    cache = CompileCache()
+    first = cache.get(REGEXES[0])
+    assert cache.get(REGEXES[0]) is first
+    assert cache.get(REGEXES[0], algorithm="hopcroft") is first
+    assert (cache.hits, cache.misses) == (2, 1)
+    assert cache.get(REGEXES[0], algorithm="moore") is not first
+    assert cache.misses == 2
+
+
+def test_least_recently_used_are_evicted():
+    sizes = [CompileCache().get(regex).nbytes for regex in REGEXES]
+    # room for the two largest DFAs
+    cache = CompileCache(max_bytes=sum(sorted(sizes)[-2:]))
+    cache.get(REGEXES[0])
+    cache.get(REGEXES[1])
+    cache.get(REGEXES[0])  # now the most recently used
+    cache.get(REGEXES[2])
+    assert cache._size <= cache.max_bytes
+    misses = cache.misses
+    cache.get(REGEXES[0])
+    assert cache.misses == misses
+    cache.get(REGEXES[1])
+    assert cache.misses == misses + 1
+
+
+def test_disk_cache_survives_restarts(tmp_path):
+    cache = CompileCache(tmp_path)
+    compiled = cache.get(REGEXES[1])
+    assert len(os.listdir(tmp_path)) == 1
+
+    restarted = CompileCache(tmp_path)
+    loaded = restarted.get(REGEXES[1])
+    assert (restarted.disk_hits, restarted.misses) == (1, 0)
+    for text in ["abx", "x", "abc"]:
+        assert loaded.fullmatch(text) == compiled.fullmatch(text)
+
+
+def test_corrupted_files_are_compiled_again(tmp_path):
+    cache = CompileCache(tmp_path)
+    cache.get(REGEXES[3])
+    (path,) = [os.path.join(tmp_path, name) for name in os.listdir(tmp_path)]
+    with open(path, "wb") as f:
+        f.write(b"CDFA")
+    restarted = CompileCache(tmp_path)
+    assert restarted.get(REGEXES[3]).fullmatch("ababc")
+    assert restarted.misses == 1
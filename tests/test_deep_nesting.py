@@ -0,0 +1,26 @@
+import pytest
+from regex_to_NFA import NFA_CLASS
+from pipeline import compile_regex
+from batch_compile import batch_compile
+
+DEPTH = 5000
+DEEP = "(" * DEPTH + "a" + ")" * DEPTH
+
+
+@pytest.mark.parametrize("construction", ["thompson", "glushkov"])
+def test_deeply_nested_regex(construction):
+    compiled = compile_regex(DEEP, construction=construction).compiled
+    assert compiled.fullmatch("a")
+    assert not compiled.fullmatch("aa")
+
+
+def test_deeply_nested_batch():
+    (result,) = batch_compile([DEEP], max_workers=1)
+    assert result.ok
+    assert result.compiled.fullmatch("a")
+
+
+@pytest.mark.parametrize("regex", ["(" * DEPTH + "a", "(" * DEPTH + "a" + ")" * (DEPTH + 1)])
+def test_deeply_nested_invalid_regex(regex):
+    with pytest.raises(ValueError):
+        NFA_CLASS(regex, export=False)
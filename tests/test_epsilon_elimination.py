@@ -0,0 +1,45 @@
+import itertools
+import re
+import pytest
+from epsilon_elimination import remove_epsilons
+from lexer import Lexer
+from nfa_simulator import NfaSimulator
+from parser_classes import EPSILON
+from pipeline import compile_nfa
+from regex_to_NFA import NFA_CLASS
+
+PATTERNS = ["(a|b)*abb", "a*b*", "(a|b?)b", "((a|b)?c)*", "(ab|a)(bc|c)", "[a-c]+.?"]
+INPUTS = ["".join(chars) for n in range(6) for chars in itertools.product("abcx", repeat=n)]
+
+
+def has_epsilons(nfa):
+    return any(transition.characters == EPSILON for transition in nfa.transitions)
+
+
+@pytest.mark.parametrize("regex", PATTERNS)
+def test_same_language_without_epsilons(regex):
+    nfa = NFA_CLASS(regex, export=False)._nfa
+    reduced = remove_epsilons(nfa)
+    assert has_epsilons(nfa) and not has_epsilons(reduced)
+    assert len(reduced.states) < len(nfa.states)
+    simulator = NfaSimulator(reduced)
+    for text in INPUTS:
+        assert simulator.fullmatch(text) == (re.fullmatch(regex, text) is not None), text
+
+
+def test_lexer_nfa_keeps_its_tags():
+    lexer = Lexer([("IF", "if"), ("ID", "[a-z]+"), ("NUM", "[0-9]+"), ("WS", " +")])
+    reduced = remove_epsilons(lexer._nfa)
+    assert reduced.accept_tags is not None
+    assert not has_epsilons(reduced)
+    compiled = compile_nfa(reduced).compiled
+    for text in ["if", "iffy", "i", "42", "  x", "x1"]:
+        assert compiled.longest_match(text) == lexer.compiled.longest_match(text), text
+
+
+def test_eliminate_epsilons_option_of_the_lexer_pipeline():
+    lexer = Lexer([("A", "a*"), ("B", "a*b")])
+    result = compile_nfa(lexer._nfa, eliminate_epsilons=True)
+    assert result.stats.reduced_nfa_states < result.stats.nfa_states
+    assert result.compiled.longest_match("aab") == (3, 1)
+    assert result.compiled.longest_match("aa") == (2, 0)
@@ -0,0 +1,41 @@
+import json
+import pytest
+from json_serialize import JsonSerialize
+from pipeline import compile_regex
+from regex_to_NFA import NFA_CLASS
+
+PATTERNS = ["(a|b)*abb", "[a-z]x", "(ab|cd)*e+", "a.b"]
+
+
+@pytest.mark.parametrize("regex", PATTERNS)
+def test_dfa_targets_are_single_state_names(tmp_path, regex):
+    result = compile_regex(regex)
+    paths = result.to_json(tmp_path)
+    for name in ("dfa", "minimized_dfa"):
+        with open(paths[name]) as f:
+            data = json.load(f)
+        for state, entry in data.items():
+            if state in ("startingState", "alphabet"):
+                continue
+            for key, target in entry.items():
+                assert isinstance(target, (str, bool)), (name, state, key, target)
+
+
+def test_minimized_dfa_has_one_edge_per_state_and_symbol():
+    minimized = compile_regex("(a|b)*abb").minimized
+    edges = [
+        (transition.from_, symbol)
+        for transition in minimized.transitions
+        for symbol in transition.characters
+    ]
+    assert len(edges) == len(set(edges))
+    assert len(minimized.states) == 4
+
+
+def test_nfa_keeps_nondeterministic_targets():
+    nfa = NFA_CLASS("a|ab", export=False, construction="glushkov")._nfa
+    data = JsonSerialize().nfa_json_serialize(nfa)
+    assert ["S1", "S2"] in [
+        sorted(target) for entry in data.values() if isinstance(entry, dict)
+        for target in entry.values() if isinstance(target, list)
+    ]
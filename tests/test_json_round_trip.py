@@ -0,0 +1,44 @@
+import pytest
+from dfa_matcher import CompiledDFA
+from json_deserialize import JsonDeserialize
+from json_serialize import JsonSerialize
+from lexer import Lexer
+from pipeline import compile_nfa, compile_regex
+
+PATTERNS = ["[a-z]x", "a.b", "(a|b)*abb", r"[.a]+\.", "[a-cx-z]+[b-y]"]
+INPUTS = ["", "ax", "zx", "xx", "aXb", "a\nb", "a.b", "abb", "babb", "aa.", "..", "axy", "cb", "yz"]
+
+
+@pytest.mark.parametrize("regex", PATTERNS)
+@pytest.mark.parametrize("streaming", [False, True])
+def test_save_load_match(tmp_path, regex, streaming):
+    result = compile_regex(regex)
+    paths = result.to_json(tmp_path)
+    for name in ("dfa", "minimized_dfa"):
+        dfa = JsonDeserialize().load_dfa(paths[name], streaming=streaming)
+        compiled = CompiledDFA.from_dfa(dfa)
+        for text in INPUTS:
+            assert compiled.fullmatch(text) == result.compiled.fullmatch(text), (name, text)
+
+
+RULES = [("IF", "if"), ("ID", "[a-z]+"), ("NUM", "[0-9]+"), ("WS", " +")]
+LEXEMES = ["if", "iffy", "x", "42", "   ", "i"]
+
+
+@pytest.mark.parametrize("streaming", [False, True])
+def test_lexer_automata_keep_their_tokens(tmp_path, streaming):
+    lexer = Lexer(RULES)
+    json_serialize = JsonSerialize()
+    nfa_path, dfa_path = tmp_path / "nfa.json", tmp_path / "dfa.json"
+    with open(nfa_path, "w") as f:
+        json_serialize.write_json(json_serialize.nfa_json_items(lexer._nfa), f)
+    with open(dfa_path, "w") as f:
+        json_serialize.write_json(json_serialize.dfa_json_items(lexer._dfa), f)
+
+    json_deserialize = JsonDeserialize()
+    from_nfa = compile_nfa(json_deserialize.load_nfa(nfa_path, streaming=streaming)).compiled
+    from_dfa = CompiledDFA.from_dfa(json_deserialize.load_dfa(dfa_path, streaming=streaming))
+    for text in LEXEMES:
+        expected = lexer.compiled.longest_match(text)
+        assert from_nfa.longest_match(text) == expected, text
+        assert from_dfa.longest_match(text) == expected, text
@@ -0,0 +1,64 @@
+import itertools
+import re
+import pytest
+from lazy_dfa import LazyDFA
+from lexer import Lexer
+from regex_to_NFA import NFA_CLASS
+
+BLOWUP = "(a|b)*a(a|b)(a|b)(a|b)"
+INPUTS = ["".join(chars) for n in range(9) for chars in itertools.product("ab", repeat=n)]
+
+
+def lazy_dfa(regex, **kwargs):
+    return LazyDFA(NFA_CLASS(regex, export=False)._nfa, **kwargs)
+
+
+def test_states_are_determinized_on_demand():
+    lazy = lazy_dfa(BLOWUP)
+    assert lazy.num_cached_states == 0
+    assert lazy.fullmatch("abbb")
+    # only the states on the path of the input
+    assert 0 < lazy.num_cached_states <= 5
+    assert lazy.cache_flushes == 0
+
+
+@pytest.mark.parametrize("max_states", [2, 3, 16, 10000])
+def test_small_caches_are_flushed_and_still_match(max_states):
+    lazy = lazy_dfa(BLOWUP, max_states=max_states, max_flushes=10 ** 9)
+    for text in INPUTS:
+        assert lazy.fullmatch(text) == (re.fullmatch(BLOWUP, text) is not None), text
+        assert lazy.num_cached_states <= max_states
+    assert (lazy.cache_flushes == 0) == (max_states == 10000)
+
+
+def test_thrashing_cache_falls_back_to_nfa_simulation():
+    lazy = lazy_dfa(BLOWUP, max_states=2, max_flushes=1)
+    for text in INPUTS:
+        assert lazy.fullmatch(text) == (re.fullmatch(BLOWUP, text) is not None), text
+    assert lazy._simulator is not None
+
+    cached = lazy_dfa(BLOWUP)
+    for text in INPUTS:
+        cached.fullmatch(text)
+    assert cached._simulator is None
+
+
+def test_flush():
+    lazy = lazy_dfa("abc")
+    lazy.match_prefix("abcd")
+    lazy.flush()
+    assert lazy.num_cached_states == 0
+    assert lazy.cache_flushes == 1
+    assert lazy.match_prefix("abcd") == 3
+
+
+def test_lexer_tokens():
+    lexer = Lexer([("IF", "if"), ("ID", "[a-z]+"), ("NUM", "[0-9]+")])
+    lazy = LazyDFA(lexer._nfa, max_states=2)
+    for text in ["if", "iffy", "42x", "x", "?"]:
+        assert lazy.longest_match(text) == lexer.compiled.longest_match(text), text
+
+
+def test_needs_two_states():
+    with pytest.raises(ValueError):
+        lazy_dfa("a", max_states=1)
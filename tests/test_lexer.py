@@ -0,0 +1,51 @@
+import pytest
+from lexer import Lexer, LexerToken
+
+RULES = [
+    ("IF", "if"),
+    ("ID", "[a-z][a-z0-9]*"),
+    ("NUM", "[0-9]+"),
+    ("EQ", "=="),
+    ("ASSIGN", "="),
+    ("WS", " +"),
+]
+
+
+@pytest.mark.parametrize("construction", ["thompson", "glushkov"])
+def test_longest_match_and_rule_priority(construction):
+    lexer = Lexer(RULES, construction=construction)
+    tokens = [(token.name, token.lexeme) for token in lexer.tokenize("if iffy == x1=42")]
+    assert tokens == [
+        ("IF", "if"),  # IF and ID match the same lexeme, IF comes first
+        ("WS", " "),
+        ("ID", "iffy"),  # longer than the IF prefix
+        ("WS", " "),
+        ("EQ", "=="),  # longer than ASSIGN
+        ("WS", " "),
+        ("ID", "x1"),
+        ("ASSIGN", "="),
+        ("NUM", "42"),
+    ]
+
+
+def test_priority_follows_the_order_of_the_rules():
+    lexer = Lexer([("ID", "[a-z]+"), ("IF", "if")])
+    assert lexer.match("if") == LexerToken("ID", "if", 0, 2)
+
+
+def test_match_positions():
+    lexer = Lexer(RULES)
+    assert lexer.match("x = 1", 2) == LexerToken("ASSIGN", "=", 2, 3)
+    assert lexer.match("x = 1", 3) == LexerToken("WS", " ", 3, 4)
+    assert lexer.match("?", 0) is None
+
+
+def test_unmatched_input_raises():
+    lexer = Lexer(RULES)
+    with pytest.raises(ValueError, match="position 3"):
+        list(lexer.tokenize("if ?"))
+
+
+def test_needs_rules():
+    with pytest.raises(ValueError):
+        Lexer([])
@@ -0,0 +1,31 @@
+import pytest
+from dfa_matcher import Matcher
+from lazy_dfa import LazyDFA
+from lexer import Lexer
+from nfa_simulator import NfaSimulator
+
+RULES = [("IF", "if"), ("ID", "[a-z]+"), ("NUM", "[0-9]+"), ("DOT", r"\."), ("ANY", ".")]
+TEXTS = ["if", "iffy.", "42", "x.y", "", "\n", "é", "if x"]
+
+
+@pytest.fixture(scope="module")
+def matchers():
+    lexer = Lexer(RULES)
+    return [lexer.compiled, LazyDFA(lexer._nfa), NfaSimulator(lexer._nfa)]
+
+
+def test_matchers_share_the_matching_surface(matchers):
+    assert all(isinstance(matcher, Matcher) for matcher in matchers)
+    compiled = matchers[0]
+    for matcher in matchers[1:]:
+        for text in TEXTS:
+            for pos in range(len(text) + 1):
+                assert matcher.longest_match(text, pos) == compiled.longest_match(text, pos)
+                assert matcher.match_prefix(text, pos) == compiled.match_prefix(text, pos)
+            assert matcher.fullmatch(text) == compiled.fullmatch(text)
+
+
+def test_columns_of_unknown_characters(matchers):
+    for matcher in matchers:
+        assert matcher.column("\n") < 0
+        assert matcher.longest_match("\n") is None
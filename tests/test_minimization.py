@@ -0,0 +1,58 @@
+import itertools
+import re
+import pytest
+from alphabet_partition import AlphabetPartition
+from NFA_to_DFA import DFA_CLASS
+from regex_to_NFA import NFA_CLASS
+
+PATTERNS = [
+    "(a|b)*abb",
+    "(a|b)*a(a|b)(a|b)",
+    "a*b*c*",
+    "(ab|ba)*",
+    "(a|ab)(c|bcd)(d*)",
+    "[a-c]+b?",
+    "((a|b)(a|b))*",
+]
+INPUTS = ["".join(chars) for n in range(6) for chars in itertools.product("abcd", repeat=n)]
+
+
+def subset_construction(regex):
+    nfa = NFA_CLASS(regex, export=False)._nfa
+    alphabet = AlphabetPartition.from_nfa(nfa)
+    dfa_class = DFA_CLASS(verbose=False)
+    dfa_class.subset_construction(alphabet.apply(nfa), alphabet.inputs)
+    return dfa_class, alphabet
+
+
+@pytest.mark.parametrize("regex", PATTERNS)
+def test_hopcroft_and_moore_find_the_same_partition(regex):
+    dfa_class, alphabet = subset_construction(regex)
+    moore = {frozenset(group) for group in dfa_class.moore_partition(alphabet.inputs)}
+    hopcroft = {frozenset(group) for group in dfa_class.hopcroft_partition(alphabet.inputs)}
+    assert moore == hopcroft
+
+
+@pytest.mark.parametrize("regex", PATTERNS)
+@pytest.mark.parametrize("algorithm", ["moore", "hopcroft"])
+def test_minimized_dfa_accepts_the_same_strings(regex, algorithm):
+    dfa_class, alphabet = subset_construction(regex)
+    minimized = dfa_class.minimize_dfa(alphabet.inputs, algorithm=algorithm)
+    next_state = {}
+    for transition in minimized.transitions:
+        for label in transition.characters:
+            next_state[transition.from_, label] = transition.to_
+    for text in INPUTS:
+        state = minimized.start
+        for char in text:
+            column = alphabet.classify(char)
+            state = next_state.get((state, alphabet.labels[column])) if column >= 0 else None
+            if state is None:
+                break
+        accepted = state is not None and state in minimized.accept
+        assert accepted == (re.fullmatch(regex, text) is not None), text
+
+
+def test_hopcroft_minimizes_the_classic_example():
+    dfa_class, alphabet = subset_construction("(a|b)*abb")
+    assert len(dfa_class.minimize_dfa(alphabet.inputs, algorithm="hopcroft").states) == 4
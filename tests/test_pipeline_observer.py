@@ -0,0 +1,36 @@
+import pytest
+from regex_to_NFA import NFA_CLASS
+from pipeline import compile_regex
+
+
+@pytest.mark.parametrize("construction", ["thompson", "glushkov"])
+def test_observer_runs_as_the_stages_end(monkeypatch, construction):
+    events = []
+    AST_to_NFA = NFA_CLASS.AST_to_NFA
+
+    def recorded_AST_to_NFA(self):
+        events.append("building the NFA")
+        AST_to_NFA(self)
+
+    recorded_AST_to_NFA.__name__ = "AST_to_NFA"
+    monkeypatch.setattr(NFA_CLASS, "AST_to_NFA", recorded_AST_to_NFA)
+    result = compile_regex(
+        "(a|b)*abb",
+        construction=construction,
+        observer=lambda stage, seconds, stats: events.append(stage),
+    )
+    assert events[:4] == ["tokenize", "parse", "building the NFA", "AST_to_NFA"]
+    events.remove("building the NFA")
+    assert list(result.stats.stage_seconds) == events
+
+
+def test_observer_can_stop_the_compile():
+    class Rejected(Exception):
+        pass
+
+    def observer(stage, seconds, stats):
+        if stage == "parse":
+            raise Rejected(stage)
+
+    with pytest.raises(Rejected):
+        compile_regex("(a|b)*abb", observer=observer)
@@ -0,0 +1,21 @@
+import re
+import pytest
+from pipeline import compile_regex
+from regex_to_NFA import NFA_CLASS
+
+PATTERNS = ["a+?", "(ab)+?c", "a*?b", "a??b", "(a|b)+?a", "[a-c]+?", "(a+?)*", "((ab)*?c)?"]
+INPUTS = ["", "a", "aa", "b", "ab", "aab", "c", "abc", "ababc", "ba", "bba", "cab", "aca"]
+
+
+@pytest.mark.parametrize("regex", PATTERNS)
+@pytest.mark.parametrize("construction", ["thompson", "glushkov"])
+def test_lazy_quantifiers_match_like_re(regex, construction):
+    compiled = compile_regex(regex, construction=construction).compiled
+    for text in INPUTS:
+        assert compiled.fullmatch(text) == (re.fullmatch(regex, text) is not None), text
+
+
+@pytest.mark.parametrize("regex", ["a*+", "(ab)?+c", "a**", "a+??"])
+def test_possessive_and_multiple_quantifiers_are_rejected(regex):
+    with pytest.raises(ValueError):
+        NFA_CLASS(regex, export=False)
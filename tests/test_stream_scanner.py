@@ -0,0 +1,79 @@
+import mmap
+import re
+import pytest
+from lexer import Lexer
+from pipeline import compile_regex
+from stream_scanner import StreamScanner
+
+TEXT = "aéé xé, a€b ab aé€€b caféé aÿb ü"
+PATTERNS = ["é+", "a.b", "[a-zé]+", "(a|é)*€+b", "caf(é|e)+", "ü"]
+
+
+def finditer(regex, text):
+    # the byte offsets of the matches of re
+    return [
+        (len(text[: m.start()].encode()), len(text[: m.end()].encode()))
+        for m in re.finditer(regex, text)
+        if m.end() > m.start()
+    ]
+
+
+def pieces(data, size):
+    return [data[i : i + size] for i in range(0, len(data), size)]
+
+
+@pytest.mark.parametrize("regex", PATTERNS)
+@pytest.mark.parametrize("chunk_size", [1, 2, 3, 5, 1000])
+def test_utf8_matches_like_re(regex, chunk_size):
+    scanner = StreamScanner(compile_regex(regex).compiled)
+    matches = scanner.scan(pieces(TEXT.encode(), chunk_size))
+    assert [(match.start, match.end) for match in matches] == finditer(regex, TEXT)
+
+
+def test_latin1_bytes():
+    scanner = StreamScanner(compile_regex("é+").compiled, encoding="latin-1")
+    matches = scanner.scan("aéé".encode("latin-1"))
+    assert [(match.start, match.end) for match in matches] == [(1, 3)]
+
+
+def test_invalid_utf8_matches_nothing():
+    scanner = StreamScanner(compile_regex("a.b").compiled)
+    matches = scanner.scan(b"a\xffb a\xc3b a\xc3\xa9b")
+    assert [(match.start, match.end) for match in matches] == [(8, 12)]
+
+
+@pytest.mark.parametrize("chunk_size", [1, 2, 7, 1000])
+def test_lexer_backtracks_across_chunks(chunk_size):
+    # in "aaa " the DFA reads past the longest match "aa" and backs up, "aab" does not back up
+    lexer = Lexer([("AB", "a*b"), ("AA", "aa"), ("A", "a"), ("WS", " +")])
+    text = b"aaab aaa aab a"
+    scanner = StreamScanner.from_lexer(lexer)
+    matches = scanner.scan(pieces(text, chunk_size))
+    tokens = [(match.name, text[match.start : match.end]) for match in matches]
+    expected = [(token.name, token.lexeme.encode()) for token in lexer.tokenize(text.decode())]
+    assert tokens == expected
+
+
+def test_file_and_mmap_sources(tmp_path):
+    text = b"x1 = 42; y22 = x1" * 1000
+    path = tmp_path / "input.txt"
+    path.write_bytes(text)
+    scanner = StreamScanner(compile_regex("[a-z][0-9]+").compiled)
+    expected = [(m.start(), m.end()) for m in re.finditer(b"[a-z][0-9]+", text)]
+    with open(path, "rb") as f:
+        assert [(m.start, m.end) for m in scanner.scan(f, chunk_size=7)] == expected
+    with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+        assert [(m.start, m.end) for m in scanner.scan(mapped)] == expected
+
+
+def test_unmatched_input_raises_for_a_lexer():
+    lexer = Lexer([("NUM", "[0-9]+"), ("WS", " +")])
+    scanner = StreamScanner.from_lexer(lexer)
+    with pytest.raises(ValueError, match="offset 3"):
+        list(scanner.scan([b"12 ", b"x"]))
+
+
+def test_text_chunks_are_rejected():
+    scanner = StreamScanner(compile_regex("a").compiled)
+    with pytest.raises(TypeError):
+        list(scanner.scan(["a"]))
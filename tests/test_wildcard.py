@@ -0,0 +1,34 @@
+import re
+import pytest
+from pipeline import compile_regex
+from lazy_dfa import LazyDFA
+from nfa_simulator import NfaSimulator
+from batch_matcher import BatchMatcher
+from stream_scanner import StreamScanner
+
+PATTERNS = [r"a\.b", "a[.]b", "a.b", r"[.a]+\.", r"(\.|x)*.", r"[.-z]"]
+INPUTS = ["a.b", "axb", "a\nb", "ab", ".a.", "xx.", "..", "x", ".", "z", "-", "/"]
+
+
+@pytest.mark.parametrize("regex", PATTERNS)
+@pytest.mark.parametrize("construction", ["thompson", "glushkov"])
+@pytest.mark.parametrize("eliminate_epsilons", [False, True])
+def test_wildcard_and_literal_dot_match_like_re(regex, construction, eliminate_epsilons):
+    result = compile_regex(
+        regex, construction=construction, eliminate_epsilons=eliminate_epsilons
+    )
+    simulator = NfaSimulator(result.nfa)
+    lazy = LazyDFA(result.nfa)
+    batch = BatchMatcher(result.compiled).fullmatch(INPUTS)
+    for text, batch_match in zip(INPUTS, batch):
+        expected = re.fullmatch(regex, text) is not None
+        assert result.compiled.fullmatch(text) == expected, text
+        assert simulator.fullmatch(text) == expected, text
+        assert lazy.fullmatch(text) == expected, text
+        assert bool(batch_match) == expected, text
+
+
+def test_stream_scanner_escaped_dot():
+    scanner = StreamScanner(compile_regex(r"a\.b").compiled)
+    matches = [(match.start, match.end) for match in scanner.scan(b"axb a.b")]
+    assert matches == [(4, 7)]